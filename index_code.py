@@ -1,66 +1,211 @@
+import hashlib
+import json
 import os
 import uuid
 from qdrant_client import QdrantClient, models
 
 # --- Configuration ---
-QDRANT_URL = "http://design:6333"
+QDRANT_URL = os.environ.get("QDRANT_URL", "http://design:6333")
 COLLECTION_NAME = "email-sorter"
 MODEL_NAME = "jinaai/jina-embeddings-v2-base-code"
 # This is the EXACT name the library is demanding in your error log:
 VECTOR_NAME = "fast-jina-embeddings-v2-base-code"
+VECTOR_SIZE = 768
 
-def main():
-    client = QdrantClient(url=QDRANT_URL)
-    
-    print(f"📥 Loading embedding model: {MODEL_NAME}...")
-    client.set_model(MODEL_NAME)
+# path -> content hash (and point IDs) of the last run; only files that changed are re-embedded
+MANIFEST_FILE = os.environ.get("CODE_INDEX_MANIFEST", "data/state/code_index_manifest.json")
+# Larger files are split on line boundaries, preferably at blank lines
+CHUNK_CHARS = int(os.environ.get("CODE_INDEX_CHUNK_CHARS", 4000))
+# Chunks embedded and upserted per request
+BATCH_SIZE = int(os.environ.get("CODE_INDEX_BATCH_SIZE", 32))
+
+EXTENSIONS = (".py", ".md")
+EXCLUDE_DIRS = {'.git', '__pycache__', '.continue', '.venv', 'node_modules', 'dist', 'build', 'data'}
+
+# Point IDs are uuid5(path + chunk hash): the same chunk always maps to the same point
+ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "email-sorter/code-index")
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def point_id(path, chunk_hash):
+    return str(uuid.uuid5(ID_NAMESPACE, f"{path}\0{chunk_hash}"))
+
+def scan(root="."):
+    """Return {relative path: content} for every non-empty .py/.md file under `root`."""
+    files = {}
+    for dirpath, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDE_DIRS)
+        for name in sorted(names):
+            if not name.endswith(EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    content = f.read()
+            except Exception as e:
+                print(f"⚠️ Error reading {path}: {e}")
+                continue
+            if content.strip():
+                files[os.path.relpath(path, root).replace(os.sep, "/")] = content
+    return files
+
+def chunk_text(text, max_chars=CHUNK_CHARS):
+    """Split `text` into chunks of at most about `max_chars`, cutting between lines."""
+    chunks = []
+    current = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        if current and size + len(line) > max_chars:
+            # Prefer the last blank line in the second half, so functions stay together
+            cut = len(current)
+            for i in range(len(current) - 1, len(current) // 2, -1):
+                if not current[i].strip():
+                    cut = i + 1
+                    break
+            chunks.append("".join(current[:cut]))
+            current = current[cut:]
+            size = sum(len(l) for l in current)
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return [c for c in chunks if c.strip()]
+
+def load_manifest(path=MANIFEST_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def fastembed_embedder(model_name=MODEL_NAME):
+    """Return embed(texts) -> list of vectors using the local fastembed model."""
+    from fastembed import TextEmbedding
+
+    model = TextEmbedding(model_name)
+    return lambda texts: [vector.tolist() for vector in model.embed(list(texts))]
+
+def _existing_ids(client, collection, ids):
+    found = set()
+    for start in range(0, len(ids), 256):
+        points = client.retrieve(collection, ids[start:start + 256], with_payload=False, with_vectors=False)
+        found.update(str(p.id) for p in points)
+    return found
+
+def _indexed_ids(client, collection):
+    """Return the IDs of code points: every point with a path and filename payload.
 
-    # 1. Ensure Collection exists (Safe mode)
-    if not client.collection_exists(COLLECTION_NAME):
-        print(f"🏗️ Creating collection {COLLECTION_NAME}...")
+    The collection is shared with mcp-server-qdrant, whose memories carry only
+    'document'/'metadata'; those are never returned, so never pruned.
+    """
+    owned = models.Filter(must_not=[
+        models.IsEmptyCondition(is_empty=models.PayloadField(key="path")),
+        models.IsEmptyCondition(is_empty=models.PayloadField(key="filename")),
+    ])
+    ids = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(collection, scroll_filter=owned, limit=1024, offset=offset,
+                                       with_payload=False, with_vectors=False)
+        ids.update(str(p.id) for p in points)
+        if offset is None:
+            return ids
+
+def reindex(client, root=".", collection=COLLECTION_NAME, manifest_path=MANIFEST_FILE, embed=None,
+            batch_size=BATCH_SIZE, chunk_chars=CHUNK_CHARS):
+    """Bring `collection` in line with the files under `root`, embedding only what changed.
+
+    Unchanged files (same content hash as in the manifest) are skipped without being chunked.
+    Changed files are chunked; chunks whose point already exists keep their vector. Points of
+    removed files and of chunks that no longer exist are deleted. Without a manifest, code points
+    (path and filename payload, including those of older runs) not produced by the current tree
+    are deleted; other points in the collection, such as MCP memories, are left alone.
+    `embed(texts) -> vectors` defaults to the local fastembed model, loaded only when needed;
+    with QdrantClient(":memory:") and a stand-in `embed` this runs without any server or model.
+    Returns counts of files and chunks seen, embedded and deleted.
+    """
+    if not client.collection_exists(collection):
+        print(f"🏗️ Creating collection {collection}...")
         client.create_collection(
-            collection_name=COLLECTION_NAME,
+            collection_name=collection,
             vectors_config={
-                VECTOR_NAME: models.VectorParams(size=768, distance=models.Distance.COSINE)
+                VECTOR_NAME: models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE)
             }
         )
+
+    previous = load_manifest(manifest_path)
+    if previous is not None and (previous.get("collection") != collection or previous.get("model") != MODEL_NAME
+                                 or previous.get("chunk_chars") != chunk_chars):
+        previous = None  # Different target or chunking: verify everything against the collection
+    old_files = previous["files"] if previous else {}
+
+    files = scan(root)
+    stats = {"files": len(files), "changed": 0, "chunks": 0, "embedded": 0, "deleted": 0}
+    manifest = {"collection": collection, "model": MODEL_NAME, "chunk_chars": chunk_chars, "files": {}}
+    wanted = {}  # point id -> (document, metadata) for chunks of changed files
+    for path, content in files.items():
+        digest = content_hash(content)
+        old = old_files.get(path)
+        if old is not None and old["hash"] == digest:
+            manifest["files"][path] = old
+            stats["chunks"] += len(old["ids"])
+            continue
+        stats["changed"] += 1
+        ids = []
+        for chunk in chunk_text(content, chunk_chars):
+            chunk_hash = content_hash(chunk)
+            pid = point_id(path, chunk_hash)
+            if pid not in wanted:
+                ids.append(pid)
+                wanted[pid] = (chunk, {"path": path, "filename": os.path.basename(path), "content_hash": chunk_hash})
+        manifest["files"][path] = {"hash": digest, "ids": ids}
+        stats["chunks"] += len(ids)
+
+    # A restarted or manifest-less run re-embeds only chunks the collection does not have yet
+    existing = _existing_ids(client, collection, list(wanted))
+    missing = [pid for pid in wanted if pid not in existing]
+    if missing and embed is None:
+        print(f"📥 Loading embedding model: {MODEL_NAME}...")
+        embed = fastembed_embedder()
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        vectors = embed([wanted[pid][0] for pid in batch])
+        client.upsert(collection, points=[
+            models.PointStruct(id=pid, vector={VECTOR_NAME: vector},
+                               payload={"document": wanted[pid][0], **wanted[pid][1]})
+            for pid, vector in zip(batch, vectors)
+        ])
+        stats["embedded"] += len(batch)
+
+    current = {pid for entry in manifest["files"].values() for pid in entry["ids"]}
+    if previous is None:
+        stale = _indexed_ids(client, collection) - current
     else:
-        print(f"📚 Using existing collection {COLLECTION_NAME}...")
-
-    # 2. Scan files
-    documents = []
-    metadata = []
-    exclude_dirs = {'.git', '__pycache__', '.continue', '.venv', 'node_modules', 'dist', 'build'}
-
-    print(f"🔍 Scanning project...")
-    for root, dirs, files in os.walk("."):
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
-        for file in files:
-            if file.endswith((".py", ".md")):
-                path = os.path.join(root, file)
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                        if content.strip():
-                            documents.append(content)
-                            metadata.append({"path": path, "filename": file})
-                except Exception as e:
-                    print(f"⚠️ Error reading {path}: {e}")
-
-    # 3. Upload
-    if documents:
-        print(f"🚀 Uploading to Design PC...")
-        client.add(
-            collection_name=COLLECTION_NAME,
-            documents=documents,
-            metadata=metadata,
-            ids=[str(uuid.uuid4()) for _ in range(len(documents))]
-            # We don't need to specify vector_name here; 
-            # client.add() will pick the Jina name automatically now.
-        )
-        print("✅ Indexing complete!")
-    else:
-        print("❌ No files found.")
+        stale = {pid for entry in old_files.values() for pid in entry["ids"]} - current
+    if stale:
+        client.delete(collection, points_selector=models.PointIdsList(points=sorted(stale)))
+        stats["deleted"] = len(stale)
+
+    # Written last: an interrupted run leaves the old manifest, and the next run catches up
+    save_manifest(manifest, manifest_path)
+    return stats
+
+def main():
+    client = QdrantClient(url=QDRANT_URL)
+
+    print(f"🔍 Indexing project into {COLLECTION_NAME}...")
+    stats = reindex(client)
+    print(f"✅ {stats['files']} files ({stats['changed']} changed), {stats['chunks']} chunks: "
+          f"{stats['embedded']} embedded, {stats['deleted']} deleted")
 
 if __name__ == "__main__":
     main()
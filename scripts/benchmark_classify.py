@@ -0,0 +1,81 @@
+# scripts/benchmark_classify.py
+"""
+Benchmark sequential vs concurrent classification against a fake Ollama server.
+- Starts scripts/fake_ollama_server.py with fixed latency, jitter and server-side parallelism
+- Classifies the same bodies with classify_emails() at several concurrency levels
+- Reports emails/sec, speed-up over concurrency 1 and TCP connections opened
+- Repeats a run through a fresh on-disk cache to show a warm run makes no LLM calls
+- Compares multi-email batched prompts (classify_emails_batched) at several batch sizes;
+  use --prompt-ms-per-kchar to model prompt processing cost on a CPU-only host
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.llm import classify
+from src.llm.cache import ClassificationCache
+from scripts.fake_ollama_server import FakeOllamaServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=48)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--server-parallel", type=int, default=8, help="Like OLLAMA_NUM_PARALLEL")
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--unordered", action="store_true", help="Yield results as they complete")
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--prompt-ms-per-kchar", type=float, default=0.0)
+    args = parser.parse_args()
+
+    bodies = [f"Thank you for applying for role {i}." for i in range(args.emails)]
+    with FakeOllamaServer(args.latency_ms / 1000, args.jitter_ms / 1000, args.server_parallel,
+                          per_kchar=args.prompt_ms_per_kchar / 1000) as server:
+        classify.OLLAMA_URL = server.url
+        print(f"{args.emails} emails, {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms per request, "
+              f"server parallel {args.server_parallel}")
+        print(f"{'in-flight':>9} {'seconds':>9} {'emails/s':>9} {'speed-up':>9} {'connections':>12}")
+        baseline = None
+        for workers in (int(c) for c in args.concurrency.split(",")):
+            server.reset_stats()
+            start = time.perf_counter()
+            results = list(classify.classify_emails(bodies, workers, ordered=not args.unordered, use_cache=False,
+                                                    use_rules=False, use_near_dup=False))
+            elapsed = time.perf_counter() - start
+            assert len(results) == len(bodies)
+            baseline = baseline or elapsed
+            print(f"{workers:>9} {elapsed:>9.2f} {len(bodies) / elapsed:>9.1f} {baseline / elapsed:>8.1f}x "
+                  f"{server.stats['connections']:>12}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            classify._cache = ClassificationCache(f"{tmp}/cache.sqlite3")
+            for run in ("cold", "warm"):
+                server.reset_stats()
+                start = time.perf_counter()
+                list(classify.classify_emails(bodies, args.server_parallel, use_cache=True, use_rules=False,
+                                              use_near_dup=False))
+                elapsed = time.perf_counter() - start
+                print(f"cache {run}: {elapsed:.2f}s, {server.stats['requests']} LLM calls, {classify._cache.stats()}")
+            classify._cache.close()
+            classify._cache = None
+
+        print(f"{'batch':>9} {'seconds':>9} {'emails/s':>9} {'requests':>9}")
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            server.reset_stats()
+            start = time.perf_counter()
+            results = list(classify.classify_emails_batched(bodies, batch_size, args.server_parallel,
+                                                            use_cache=False, use_rules=False, use_near_dup=False))
+            elapsed = time.perf_counter() - start
+            assert len(results) == len(bodies)
+            print(f"{batch_size:>9} {elapsed:>9.2f} {len(bodies) / elapsed:>9.1f} {server.stats['requests']:>9}")
+
+
+if __name__ == "__main__":
+    main()
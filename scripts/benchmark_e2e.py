@@ -0,0 +1,222 @@
+# scripts/benchmark_e2e.py
+"""
+End-to-end benchmark suite against local stand-ins; no Gmail or Ollama host needed.
+- In-process IMAP server (fake_imap_server.py) seeded with synthetic messages plus
+  data/samples/eml if present
+- Fake Ollama (fake_ollama_server.py) with configurable latency, jitter and parallel slots
+- Scenarios, each in a fresh subprocess so peak RSS is per scenario:
+    fetch     UID SEARCH + batched UID FETCH of the whole folder (EmailClient.iter_unread)
+    parse     parse_rfc822 on every message
+    classify  classify_emails with OLLAMA_CONCURRENCY in flight (cache and rules off)
+    store     SQLite result store upserts, plus the JSONL log
+    pipeline  fetch -> parse -> classify -> store through pipeline.run_pipeline
+- Reports messages/sec, p50/p95 per-message latency and peak RSS; --json writes the
+  numbers to a file so runs can be compared
+- All files are written to a temporary directory
+"""
+
+import argparse
+import imaplib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from scripts.benchmark_parse_memory import peak_rss_mib
+from scripts.fake_imap_server import FakeImapServer, Mailbox, make_synthetic_message, load_sample_messages
+from scripts.fake_ollama_server import FakeOllamaServer
+
+SCENARIOS = ("fetch", "parse", "classify", "store", "pipeline")
+
+
+def seed_messages(count: int) -> list[bytes]:
+    samples = load_sample_messages()
+    return [samples[i % len(samples)] if samples and i % 2 else make_synthetic_message(i, html=i % 4 == 1)
+            for i in range(count)]
+
+
+def connect(host, port, username, password):
+    mail = imaplib.IMAP4(host, port)
+    mail.login(username, password)
+    return mail
+
+
+def make_client(server, tmp):
+    from imap.client import EmailClient
+    account = {"host": "127.0.0.1", "port": server.port, "username": "bench", "password": "bench",
+               "folders": ["INBOX"]}
+    return EmailClient([account], since_days=None, state_path=os.path.join(tmp, "sync.json"), connect=connect)
+
+
+def timed(items):
+    """Yield (latency, item): the time each item took to arrive."""
+    start = time.perf_counter()
+    for item in items:
+        now = time.perf_counter()
+        yield now - start, item
+        start = time.perf_counter()
+
+
+def scenario_fetch(args, raws, tmp):
+    with FakeImapServer(seeded(raws), latency=args.imap_latency_ms / 1000) as server:
+        client = make_client(server, tmp)
+        latencies = [latency for latency, _ in timed(client.iter_unread())]
+        client.logout()
+    return latencies
+
+
+def scenario_parse(args, raws, tmp):
+    from imap.parser import parse_rfc822
+    return [latency for latency, _ in timed(parse_rfc822(raw) for raw in raws)]
+
+
+def scenario_classify(args, raws, tmp):
+    from imap.parser import parse_rfc822
+    import llm.classify as classify
+    bodies = [parse_rfc822(raw)["body"] for raw in raws]
+    with fake_ollama(args) as server:
+        classify.OLLAMA_URL = server.url
+        latencies = []
+
+        def run(body):
+            start = time.perf_counter()
+            classify.classify_email(body, use_cache=False, use_rules=False, use_near_dup=False)
+            latencies.append(time.perf_counter() - start)
+
+        list(classify._in_flight(run, bodies, args.concurrency, ordered=False))
+    return latencies
+
+
+def scenario_store(args, raws, tmp):
+    from imap.parser import parse_rfc822
+    from storage import jsonl_store
+    from storage.sqlite_store import SqliteStore
+    records = [{"email": parse_rfc822(raw), "classification": {"category": "application_acknowledged",
+                                                                "confidence": 0.9}} for raw in raws]
+    store = SqliteStore(os.path.join(tmp, "results.sqlite3"))
+    writer = jsonl_store.JsonlWriter(os.path.join(tmp, "results.jsonl"))
+
+    def write(record):
+        store.store(record)
+        writer.write(record)
+        return record
+
+    latencies = [latency for latency, _ in timed(write(r) for r in records)]
+    store.close()
+    writer.close()
+    return latencies
+
+
+def scenario_pipeline(args, raws, tmp):
+    import llm.classify as classify
+    from pipeline import run_pipeline
+    from storage import jsonl_store
+    from storage.sqlite_store import SqliteStore
+    store = SqliteStore(os.path.join(tmp, "results.sqlite3"))
+    writer = jsonl_store.JsonlWriter(os.path.join(tmp, "results.jsonl"))
+
+    def store_record(record):
+        data = {"email": record["email"], "classification": record["classification"]}
+        store.store(data)
+        writer.write(data)
+
+    def fetched(records):
+        for record in records:
+            record["fetched_at"] = time.perf_counter()
+            yield record
+
+    with FakeImapServer(seeded(raws), latency=args.imap_latency_ms / 1000) as imap, fake_ollama(args) as ollama:
+        classify.OLLAMA_URL = ollama.url
+        client = make_client(imap, tmp)
+        latencies = []
+        for record in run_pipeline(fetched(client.iter_unread()), classify_workers=args.concurrency,
+                                   classify=lambda email: classify.classify_email(
+                                       email["body"], use_cache=False, use_rules=False, use_near_dup=False),
+                                   store=store_record):
+            # Time from arriving off the wire to being stored
+            latencies.append(time.perf_counter() - record["fetched_at"])
+        client.logout()
+    store.close()
+    writer.close()
+    return latencies
+
+
+def seeded(raws):
+    mailbox = Mailbox()
+    for raw in raws:
+        mailbox.append("INBOX", raw)
+    return mailbox
+
+
+def fake_ollama(args):
+    return FakeOllamaServer(latency=args.ollama_latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                            parallel=args.ollama_parallel)
+
+
+def run_scenario(args) -> dict:
+    raws = seed_messages(args.messages)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        latencies = globals()[f"scenario_{args.scenario}"](args, raws, tmp)
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+    return {
+        "scenario": args.scenario,
+        "messages": len(latencies),
+        "seconds": elapsed,
+        "msgs_per_sec": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": quantiles[18] * 1000,
+        "peak_rss_mib": peak_rss_mib(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--imap-latency-ms", type=float, default=5.0, help="Simulated round-trip per IMAP command")
+    parser.add_argument("--ollama-latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform extra delay per LLM call")
+    parser.add_argument("--ollama-parallel", type=int, default=4, help="Requests the fake Ollama serves at once")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM requests kept in flight")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args)))
+        return
+
+    forwarded = [f"--{name.replace('_', '-')}={value}" for name, value in vars(args).items()
+                 if name not in ("scenarios", "json", "scenario")]
+    print(f"{args.messages} messages, IMAP {args.imap_latency_ms:.0f} ms/command, Ollama "
+          f"{args.ollama_latency_ms:.0f}+{args.jitter_ms:.0f} ms x{args.ollama_parallel}, {args.concurrency} in flight")
+    print(f"{'scenario':<9} {'msgs/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak RSS MiB':>13}")
+    results = []
+    for scenario in args.scenarios.split(","):
+        output = subprocess.run([sys.executable, __file__, f"--scenario={scenario}", *forwarded],
+                                capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{scenario:<9} failed:\n{output.stderr}")
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{scenario:<9} {result['msgs_per_sec']:>9.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+              f"{result['peak_rss_mib']:>13.0f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# scripts/benchmark_html_text.py
+"""
+Benchmark HTML-to-text: BeautifulSoup(html, "lxml").get_text() vs the streaming html_to_text.
+- Uses the text/html parts of data/samples/eml; synthetic marketing-style HTML fills in
+  when the corpus is missing or has no HTML mail (--synthetic adds more either way)
+- Reports milliseconds per document, peak traced memory and average output length for
+  the old path, html_to_text without a budget and html_to_text with --max-chars
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from email import message_from_bytes
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+
+from src.imap.html_text import html_to_text
+from scripts.fake_imap_server import make_synthetic_message, load_sample_messages
+
+
+def html_parts(raw: bytes) -> list[str]:
+    parts = []
+    for part in message_from_bytes(raw).walk():
+        if part.get_content_type() == "text/html":
+            payload = part.get_payload(decode=True)
+            if payload:
+                parts.append(payload.decode(errors="ignore"))
+    return parts
+
+
+def measure(convert, documents: list[str], repeat: int) -> tuple[float, int, float]:
+    """Return (ms per document, peak bytes for one pass, average output length)."""
+    tracemalloc.start()
+    lengths = [len(convert(html)) for html in documents]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in documents:
+            convert(html)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / (repeat * len(documents)), peak, sum(lengths) / len(lengths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default="data/samples/eml")
+    parser.add_argument("--synthetic", type=int, default=0, help="Synthetic HTML emails to add")
+    parser.add_argument("--body-size", type=int, default=30000, help="Visible text per synthetic email")
+    parser.add_argument("--max-chars", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = [html for raw in load_sample_messages(args.dir) for html in html_parts(raw)]
+    print(f"{len(documents)} HTML parts in {args.dir}")
+    synthetic = args.synthetic or (0 if documents else 200)
+    documents += [html for i in range(synthetic)
+                  for html in html_parts(make_synthetic_message(i, args.body_size, html=True))]
+    if synthetic:
+        print(f"{synthetic} synthetic HTML emails added")
+    print(f"{len(documents)} documents, {sum(map(len, documents)) / len(documents) / 1024:.1f} KiB average\n")
+
+    paths = [
+        ("beautifulsoup", lambda html: BeautifulSoup(html, "lxml").get_text()),
+        ("html_to_text", lambda html: html_to_text(html, None)),
+        (f"html_to_text {args.max_chars}", lambda html: html_to_text(html, args.max_chars)),
+    ]
+    print(f"{'path':<20} {'ms/doc':>8} {'peak KiB':>9} {'chars out':>10}")
+    for name, convert in paths:
+        ms, peak, length = measure(convert, documents, args.repeat)
+        print(f"{name:<20} {ms:>8.3f} {peak / 1024:>9.0f} {length:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
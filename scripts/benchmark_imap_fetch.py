@@ -0,0 +1,66 @@
+# scripts/benchmark_imap_fetch.py
+"""
+Benchmark per-message vs batched UID FETCH against a local IMAP stand-in.
+- Seeds the fake server with synthetic messages (plus data/samples/eml if present)
+- Optionally attaches a binary file to each synthetic message (--attachment-kb)
+- Simulates a network round-trip with a fixed per-command delay
+- Reports round-trips per message, bytes per message and total wall time for
+  each fetch mode (full RFC822 vs lazy header/structure-first) and batch size
+"""
+
+import argparse
+import imaplib
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.imap.client import search_uids, iter_fetch_batched
+from scripts.fake_imap_server import FakeImapServer, Mailbox, make_synthetic_message, load_sample_messages
+
+
+def run(server: FakeImapServer, folder: str, batch_size: int, fetch_mode: str) -> tuple[int, int, int, float]:
+    """Fetch every message in `folder` and return (messages, round-trips, bytes, seconds)."""
+    with imaplib.IMAP4("127.0.0.1", server.port) as mail:
+        mail.login("user", "pass")
+        mail.select(folder)
+        server.reset_stats()
+        start = time.perf_counter()
+        uids = search_uids(mail, since_days=None)
+        count = sum(1 for _ in iter_fetch_batched(mail, uids, batch_size, fetch_mode))
+        elapsed = time.perf_counter() - start
+        return count, server.total_commands(), server.bytes_sent, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated round-trip per command")
+    parser.add_argument("--batch-sizes", default="1,50,200,500")
+    parser.add_argument("--modes", default="full,lazy")
+    parser.add_argument("--attachment-kb", type=int, default=0, help="Attachment size per synthetic message")
+    args = parser.parse_args()
+
+    mailbox = Mailbox()
+    samples = load_sample_messages()
+    for i in range(args.messages):
+        raw = samples[i % len(samples)] if samples and i % 2 else make_synthetic_message(i, attachment_size=args.attachment_kb * 1024)
+        mailbox.append("INBOX", raw)
+
+    with FakeImapServer(mailbox, latency=args.latency_ms / 1000) as server:
+        if "lazy" in args.modes:
+            # Warm the server's parsed-message cache so its MIME parsing is not timed
+            run(server, "INBOX", max(int(b) for b in args.batch_sizes.split(",")), "lazy")
+        print(f"{args.messages} messages, {args.latency_ms:.1f} ms per command")
+        print(f"{'mode':>5} {'batch':>6} {'round-trips':>12} {'per msg':>9} {'KiB/msg':>9} {'seconds':>9} {'msg/s':>9}")
+        for fetch_mode in args.modes.split(","):
+            for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+                count, commands, sent, elapsed = run(server, "INBOX", batch_size, fetch_mode)
+                print(f"{fetch_mode:>5} {batch_size:>6} {commands:>12} {commands / count:>9.3f} "
+                      f"{sent / count / 1024:>9.1f} {elapsed:>9.2f} {count / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
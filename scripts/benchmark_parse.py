@@ -0,0 +1,53 @@
+# scripts/benchmark_parse.py
+"""
+Benchmark parse_rfc822 serially vs parse_many on a process pool.
+- Parses synthetic messages (half HTML-only, so the HTML-to-text path runs) plus data/samples/eml if present
+- Reports messages per second for each worker count and chunk size
+- Speed-up is bounded by the number of cores on the machine
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.imap.parser import parse_rfc822, parse_many
+from scripts.fake_imap_server import make_synthetic_message, load_sample_messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--body-size", type=int, default=4000)
+    parser.add_argument("--workers", default=f"2,{os.cpu_count() or 1}")
+    parser.add_argument("--chunk-sizes", default="16,64,256")
+    args = parser.parse_args()
+
+    samples = load_sample_messages()
+    raws = [samples[i % len(samples)] if samples and i % 4 == 3
+            else make_synthetic_message(i, args.body_size, html=i % 2 == 1) for i in range(args.messages)]
+    print(f"{args.messages} messages, {sum(map(len, raws)) / len(raws) / 1024:.1f} KiB average, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'chunk':>6} {'seconds':>9} {'msg/s':>9}")
+
+    start = time.perf_counter()
+    for raw in raws:
+        parse_rfc822(raw)
+    serial = time.perf_counter() - start
+    print(f"{'serial':>7} {'-':>6} {serial:>9.2f} {len(raws) / serial:>9.0f}")
+
+    for workers in sorted({int(w) for w in args.workers.split(",")}):
+        for chunk_size in (int(c) for c in args.chunk_sizes.split(",")):
+            start = time.perf_counter()
+            count = sum(1 for _ in parse_many(raws, workers, chunk_size))
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>7} {chunk_size:>6} {elapsed:>9.2f} {count / elapsed:>9.0f}  "
+                  f"x{serial / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# scripts/benchmark_parse_memory.py
+"""
+Measure peak memory of parsing a synthetic mailbox with and without parse_rfc822's caps.
+- Generates --messages synthetic emails: mostly ordinary mail, plus mailing-list digests
+  with a huge text body, mail with a large inline text attachment and mail with binary attachments
+- Each mode runs in a fresh subprocess so peak RSS is not shared between modes:
+    list-uncapped    all raw messages in a list first (fetch_all_unread_emails style), no caps
+    stream-uncapped  one message at a time, no caps
+    stream-capped    one message at a time with the default caps
+- Reports seconds, peak RSS and average body length per mode
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.imap.parser import parse_rfc822
+from scripts.fake_imap_server import make_synthetic_message
+
+MODES = ("list-uncapped", "stream-uncapped", "stream-capped")
+
+
+def large_message(kind: int, size_mb: float) -> bytes:
+    big = int(size_mb * 1024 * 1024)
+    if kind == 1:
+        # Mailing-list digest: one enormous text/plain body
+        return make_synthetic_message(kind, big)
+    if kind == 2:
+        msg = EmailMessage()
+        msg["Subject"] = "Build logs"
+        msg["From"] = "ci@example.com"
+        msg["To"] = "candidate@example.com"
+        msg["Date"] = "Mon, 01 Jan 2024 10:00:00 +0000"
+        msg.set_content("Build log attached inline.")
+        msg.add_attachment("log line 0000\n" * (big // 14), disposition="inline")
+        return msg.as_bytes()
+    return make_synthetic_message(kind, attachment_size=big)
+
+
+def make_message(index: int, large: dict) -> bytes:
+    if index % 100 in (1, 2):
+        return large[index % 100]
+    if index % 25 == 3:
+        return large[3]
+    return make_synthetic_message(index, html=index % 2 == 1)
+
+
+def peak_rss_mib() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_mode(mode: str, messages: int, templates: str) -> dict:
+    # Large messages are built by the parent process, so building them is not measured here
+    large = {kind: (Path(templates) / f"{kind}.eml").read_bytes() for kind in (1, 2, 3)}
+    caps = {} if mode.endswith("-capped") else {"max_message_bytes": None, "max_part_bytes": None,
+                                                 "max_body_chars": None}
+    start = time.perf_counter()
+    if mode.startswith("list"):
+        # Copies, as messages fetched from a server would be
+        raws = [bytes(bytearray(make_message(i, large))) for i in range(messages)]
+        parsed = [parse_rfc822(raw, **caps) for raw in raws]
+        body_chars = sum(len(p["body"]) for p in parsed)
+    else:
+        body_chars = sum(len(parse_rfc822(make_message(i, large), **caps)["body"]) for i in range(messages))
+    return {"seconds": time.perf_counter() - start, "peak_rss_mib": peak_rss_mib(),
+            "avg_body_chars": body_chars / messages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--size-mb", type=float, default=8.0, help="Size of digests and attachments")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--templates", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.messages, args.templates)))
+        return
+
+    templates = tempfile.TemporaryDirectory()
+    for kind in (1, 2, 3):
+        (Path(templates.name) / f"{kind}.eml").write_bytes(large_message(kind, args.size_mb))
+
+    print(f"{args.messages} messages, {args.size_mb} MiB digests/attachments (1% digests, 1% inline text "
+          f"attachments, 4% binary attachments)")
+    print(f"{'mode':<16} {'seconds':>8} {'peak RSS MiB':>13} {'avg body chars':>15}")
+    for mode in args.modes.split(","):
+        output = subprocess.run([sys.executable, __file__, "--mode", mode, "--messages", str(args.messages),
+                                 "--templates", templates.name], capture_output=True, text=True)
+        if output.returncode != 0:
+            # Typically SIGKILL from the OOM killer in list mode
+            print(f"{mode:<16} failed with exit code {output.returncode}")
+            continue
+        result = json.loads(output.stdout)
+        print(f"{mode:<16} {result['seconds']:>8.1f} {result['peak_rss_mib']:>13.0f} "
+              f"{result['avg_body_chars']:>15.0f}")
+    templates.cleanup()
+
+
+if __name__ == "__main__":
+    main()
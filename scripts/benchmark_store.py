@@ -0,0 +1,58 @@
+# scripts/benchmark_store.py
+"""
+Benchmark per-email store cost: JSON array read-modify-write vs append-only JSON Lines.
+- Runs in a temporary directory; nothing is written under data/
+- Reports the average cost per stored email in windows as the file grows
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.storage import json_store, jsonl_store
+
+
+def sample_record(i: int) -> dict:
+    return {
+        "email": {"subject": f"Application update #{i}", "from": "jobs@example.com", "to": "me@example.com",
+                  "date": "2024-01-01 10:00", "body": "Thank you for applying. " * 40},
+        "classification": {"category": "application_acknowledged", "confidence": 0.9, "rationale": "Fake"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=500)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.makedirs("data/results")
+        try:
+            for name, store in (("json", json_store.store_email_classification),
+                                ("jsonl", jsonl_store.store_email_classification)):
+                costs = []
+                start = time.perf_counter()
+                for i in range(args.emails):
+                    store(sample_record(i))
+                    if (i + 1) % args.window == 0:
+                        now = time.perf_counter()
+                        costs.append((now - start) / args.window * 1000)
+                        start = now
+                jsonl_store.close()
+                windows = " ".join(f"{c:7.3f}" for c in costs)
+                print(f"{name:>5} ms/email per {args.window}-email window: {windows}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
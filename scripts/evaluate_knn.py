@@ -0,0 +1,67 @@
+# scripts/evaluate_knn.py
+"""
+Evaluate the kNN fast path (llm/knn.py) on the labelled emails in the SQLite result store.
+- Leave-one-out: every email is classified from its neighbours among all the others
+- For each agreement threshold, reports coverage (emails answered without the LLM) and
+  accuracy against the stored (LLM) label
+- Reports the embedding time per email; compare with the LLM time per email
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.llm.condense import condense_body
+from src.llm.knn import KNN_K, KNN_MIN_SIMILARITY, KnnIndex, embed, vote
+from src.llm.prompts import CATEGORIES
+from src.storage.sqlite_store import DB_FILE, SqliteStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--k", type=int, default=KNN_K)
+    parser.add_argument("--min-similarity", type=float, default=KNN_MIN_SIMILARITY)
+    parser.add_argument("--thresholds", default="0.6,0.7,0.8,0.9,1.0")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"Result store not found: {args.db}")
+        return
+    store = SqliteStore(args.db)
+    rows = [r for r in store.query() if r["classification"].get("category") in CATEGORIES]
+    store.close()
+    if len(rows) <= args.k:
+        print(f"Need more than {args.k} labelled emails, found {len(rows)}")
+        return
+
+    labels = [r["classification"]["category"] for r in rows]
+    start = time.perf_counter()
+    vectors = embed(condense_body(r["email"].get("body", "")) for r in rows)
+    embed_ms = (time.perf_counter() - start) * 1000 / len(rows)
+
+    index = KnnIndex()
+    index.add(vectors, labels)
+    # One extra neighbour, since every email finds itself first
+    neighbours = [index.search(vector, args.k + 1)[1:] for vector in vectors]
+
+    print(f"{len(rows)} labelled emails, k={args.k}, min similarity {args.min_similarity}")
+    print(f"Embedding: {embed_ms:.1f} ms per email")
+    print(f"{'agreement':>9} {'coverage':>9} {'accuracy':>9}")
+    for threshold in (float(t) for t in args.thresholds.split(",")):
+        answered = correct = 0
+        for label, found in zip(labels, neighbours):
+            winner = vote(found, args.k, threshold, args.min_similarity)
+            if winner is not None:
+                answered += 1
+                correct += winner[0] == label
+        accuracy = f"{correct / answered:.1%}" if answered else "-"
+        print(f"{threshold:>9.2f} {answered / len(rows):>9.1%} {accuracy:>9}")
+
+
+if __name__ == "__main__":
+    main()
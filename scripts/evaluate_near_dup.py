@@ -0,0 +1,98 @@
+# scripts/evaluate_near_dup.py
+"""
+Evaluate the near-duplicate template index (llm/near_dup.py) on the sample .eml corpus.
+- Leave-one-out: every email is matched against all the others
+- For each similarity threshold, reports coverage (emails answered without the LLM) and
+  precision against the filename labels used by sanity_check_samples.py
+- With --db, uses the labelled emails in the SQLite result store instead
+- Reports the signature and lookup time per email
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.imap.parser import parse_rfc822
+from src.llm.condense import condense_body
+from src.llm.near_dup import MinHashIndex, agree, signature
+from src.llm.prompts import CATEGORIES
+from scripts.evaluate_rules import LABEL_TO_CATEGORY
+from scripts.sanity_check_samples import classify_email as label_from_filename
+
+
+def _sample_corpus(emails_dir):
+    for eml_file in sorted(Path(emails_dir).glob("*.eml")):
+        category = LABEL_TO_CATEGORY.get(label_from_filename(eml_file.name))
+        if category:
+            yield eml_file.name, parse_rfc822(eml_file.read_bytes())["body"], category
+
+
+def _result_store(db):
+    from src.storage.sqlite_store import SqliteStore
+
+    store = SqliteStore(db)
+    rows = store.query()
+    store.close()
+    for row in rows:
+        category = row["classification"].get("category")
+        if category in CATEGORIES:
+            yield row["email"].get("message_id", ""), row["email"].get("body", ""), category
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default="data/samples/eml")
+    parser.add_argument("--db", help="Evaluate on a SQLite result store instead of the sample corpus")
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.9")
+    parser.add_argument("--show", action="store_true", help="List wrong matches at the lowest threshold")
+    args = parser.parse_args()
+
+    if args.db and not Path(args.db).exists():
+        print(f"Result store not found: {args.db}")
+        return
+    emails = list(_result_store(args.db) if args.db else _sample_corpus(args.dir))
+    if len(emails) < 2:
+        print(f"Need at least 2 labelled emails, found {len(emails)}")
+        return
+
+    start = time.perf_counter()
+    signatures = [signature(condense_body(body)) for _, body, _ in emails]
+    sign_us = (time.perf_counter() - start) * 1e6 / len(emails)
+
+    index = MinHashIndex()
+    rows = [i for i, sig in enumerate(signatures) if sig is not None]
+    index.add([signatures[i] for i in rows], [{"category": emails[i][2], "row": i} for i in rows])
+
+    thresholds = sorted(float(t) for t in args.thresholds.split(","))
+    start = time.perf_counter()
+    # Everything above the lowest threshold; higher thresholds are subsets
+    matches = {i: [m for m in index.search(signatures[i], thresholds[0]) if m[0]["row"] != i] for i in rows}
+    lookup_us = (time.perf_counter() - start) * 1e6 / max(1, len(rows))
+
+    print(f"{len(emails)} labelled emails, {len(emails) - len(rows)} too short to sign")
+    print(f"Signature: {sign_us:.0f} µs per email, lookup: {lookup_us:.0f} µs per email ({len(index)} indexed)")
+    print(f"{'threshold':>9} {'coverage':>9} {'precision':>9}")
+    for threshold in thresholds:
+        answered = correct = 0
+        for i in rows:
+            match = agree([m for m in matches[i] if m[1] >= threshold])
+            if match is not None:
+                answered += 1
+                correct += match[0]["category"] == emails[i][2]
+        precision = f"{correct / answered:.1%}" if answered else "-"
+        print(f"{threshold:>9.2f} {answered / len(emails):>9.1%} {precision:>9}")
+
+    if args.show:
+        for i in rows:
+            match = agree(matches[i])
+            if match is not None and match[0]["category"] != emails[i][2]:
+                other = emails[match[0]["row"]]
+                print(f"{match[1]:.2f} {emails[i][2]:<26} {emails[i][0]}  ~  {other[2]:<26} {other[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# scripts/evaluate_rules.py
+"""
+Evaluate the rule pre-classifier (llm/rules.py) on the sample .eml corpus.
+- Reports the fraction of emails the rules answer without the LLM (deflection)
+- Reports agreement with the filename labels used by sanity_check_samples.py
+- Unless --no-llm is given, also classifies every email with the LLM (rules
+  disabled) and reports how often the rules agree with it
+- Reports the time the rule stage takes per email
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path so src modules can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.imap.parser import parse_rfc822
+from src.llm.classify import classify_email
+from src.llm.condense import condense_body
+from src.llm.rules import match_rules
+from scripts.sanity_check_samples import classify_email as label_from_filename
+
+# Filename labels -> prompt categories
+LABEL_TO_CATEGORY = {
+    "application_received": "application_acknowledged",
+    "application_rejected": "application_rejected",
+    "job_opening": "job_opportunity",
+    "irrelevant": "not_relevant",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default="data/samples/eml")
+    parser.add_argument("--no-llm", action="store_true", help="Skip the LLM agreement check")
+    args = parser.parse_args()
+
+    emails_dir = Path(args.dir)
+    eml_files = sorted(emails_dir.glob("*.eml")) if emails_dir.exists() else []
+    if not eml_files:
+        print(f"No .eml files found in {emails_dir}")
+        return
+
+    deflected = labelled = label_agree = llm_checked = llm_agree = 0
+    rule_seconds = 0.0
+    for eml_file in eml_files:
+        parsed = parse_rfc822(eml_file.read_bytes())
+        start = time.perf_counter()
+        result = match_rules(parsed["subject"], condense_body(parsed["body"]))
+        rule_seconds += time.perf_counter() - start
+        if result is None:
+            continue
+
+        deflected += 1
+        expected = LABEL_TO_CATEGORY.get(label_from_filename(eml_file.name))
+        if expected:
+            labelled += 1
+            label_agree += expected == result["category"]
+
+        llm_category = "-"
+        if not args.no_llm:
+            llm_result = classify_email(parsed["body"], use_cache=True, subject=parsed["subject"], use_rules=False,
+                                        use_near_dup=False)
+            llm_category = llm_result.get("category", "Error")
+            if llm_category != "Error":
+                llm_checked += 1
+                llm_agree += llm_category == result["category"]
+        print(f"{result['category']:<26} llm={llm_category:<26} label={expected or '-':<26} {eml_file.name}")
+
+    total = len(eml_files)
+    print("=" * 80)
+    print(f"Emails           : {total}")
+    print(f"Deflected        : {deflected} ({deflected / total:.0%})")
+    print(f"Rule time        : {rule_seconds / total * 1e6:.0f} µs per email")
+    if labelled:
+        print(f"Filename agree   : {label_agree}/{labelled} ({label_agree / labelled:.0%})")
+    if llm_checked:
+        print(f"LLM agree        : {llm_agree}/{llm_checked} ({llm_agree / llm_checked:.0%})")
+
+
+if __name__ == "__main__":
+    main()
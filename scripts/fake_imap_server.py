@@ -0,0 +1,462 @@
+# scripts/fake_imap_server.py
+"""
+In-process IMAP stand-in for benchmarks and offline checks.
+- Speaks enough IMAP4rev1 over plain TCP for imaplib.IMAP4 to log in, select,
+  search and fetch (RFC822, BODY[section]<partial>, HEADER.FIELDS, BODYSTRUCTURE)
+- Supports IDLE: announces EXISTS as soon as a message is appended to the folder
+- Supports LIST, CREATE, COPY, MOVE, STORE and EXPUNGE (UID forms too) so server-side
+  actions can be exercised; drop "MOVE"/"UIDPLUS" from `capabilities` to test fallbacks
+- Seeds folders from synthetic messages and/or data/samples/eml
+- Adds a configurable per-command delay to simulate network round-trips
+- Counts commands so callers can report round-trips per message
+"""
+
+import re
+import select
+import socket
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+from email.message import EmailMessage
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_SEARCH_MONTHS = {m: i for i, m in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+
+def make_synthetic_message(index: int, body_size: int = 2000, date: datetime | None = None,
+                           attachment_size: int = 0, html: bool = False) -> bytes:
+    """Build a recruiter-style RFC822 message, optionally HTML-only and/or with a binary attachment."""
+    msg = EmailMessage()
+    msg["Subject"] = f"Application update #{index}"
+    msg["From"] = f"Recruiter {index % 17} <jobs{index % 17}@example.com>"
+    msg["To"] = "candidate@example.com"
+    msg["Date"] = format_datetime(date or datetime.now(timezone.utc) - timedelta(minutes=index))
+    msg["Message-ID"] = f"<synthetic-{index}@example.com>"
+    line = f"Thank you for applying for role {index}. We have received your application.\n"
+    text = (line * (body_size // len(line) + 1))[:body_size]
+    if html:
+        # Marketing-style markup: inline styles, a tracking script and a hidden preheader
+        paragraphs = "".join(f'<tr><td style="padding:8px;font-family:Arial">{p}</td></tr>' for p in text.splitlines())
+        msg.set_content(f'<html><head><style>td {{color:#333}}</style><script>track({index})</script></head>'
+                        f'<body><div style="display:none">Preview text {index}</div><table>{paragraphs}</table>'
+                        f'</body></html>', subtype="html")
+    else:
+        msg.set_content(text)
+    if attachment_size:
+        msg.add_attachment((bytes(range(251)) * (attachment_size // 251 + 1))[:attachment_size], maintype="application",
+                           subtype="pdf", filename=f"job-spec-{index}.pdf")
+    return msg.as_bytes()
+
+
+def load_sample_messages(path: str = "data/samples/eml") -> list[bytes]:
+    """Return the raw bytes of every .eml file under `path` (empty if missing)."""
+    folder = Path(path)
+    if not folder.exists():
+        return []
+    return [f.read_bytes() for f in sorted(folder.glob("*.eml"))]
+
+
+class Mailbox:
+    """Thread-safe store of folders, each an ordered list of (uid, raw, flags)."""
+
+    def __init__(self, uidvalidity: int = 1):
+        self.lock = threading.Lock()
+        self.folders: dict[str, list[list]] = {}
+        self.uidvalidity: dict[str, int] = {}
+        self.next_uid: dict[str, int] = {}
+        self.default_uidvalidity = uidvalidity
+
+    def create(self, folder: str) -> None:
+        with self.lock:
+            if folder not in self.folders:
+                self.folders[folder] = []
+                self.uidvalidity[folder] = self.default_uidvalidity
+                self.next_uid[folder] = 1
+
+    def append(self, folder: str, raw: bytes, flags: set | None = None) -> int:
+        self.create(folder)
+        with self.lock:
+            uid = self.next_uid[folder]
+            self.next_uid[folder] = uid + 1
+            self.folders[folder].append([uid, raw, set(flags or ())])
+            return uid
+
+
+def _parse_sequence_set(spec: str, highest: int) -> list[tuple[int, int]]:
+    ranges = []
+    for part in spec.split(","):
+        if ":" in part:
+            lo, hi = part.split(":", 1)
+        else:
+            lo = hi = part
+        lo_n = highest if lo == "*" else int(lo)
+        hi_n = highest if hi == "*" else int(hi)
+        ranges.append((min(lo_n, hi_n), max(lo_n, hi_n)))
+    return ranges
+
+
+def _in_ranges(value: int, ranges: list[tuple[int, int]]) -> bool:
+    return any(lo <= value <= hi for lo, hi in ranges)
+
+
+def _message_date(raw: bytes) -> datetime | None:
+    match = re.search(rb"^Date:\s*(.+?)\r?$", raw, re.M | re.I)
+    if not match:
+        return None
+    try:
+        return parsedate_to_datetime(match.group(1).decode(errors="ignore"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _quote(value) -> str:
+    if value is None:
+        return "NIL"
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _bodystructure(part) -> str:
+    """Render an email.message part as an IMAP BODYSTRUCTURE expression."""
+    if part.is_multipart():
+        children = "".join(_bodystructure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype().upper())} NIL NIL NIL NIL)"
+    params = [(k, v) for k, v in part.get_params(header="content-type")[1:]] if part.get_params() else []
+    param_list = "(" + " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in params) + ")" if params else "NIL"
+    encoding = (part.get("Content-Transfer-Encoding") or "7bit").upper()
+    payload = _payload_bytes(part)
+    fields = (f"{_quote(part.get_content_maintype().upper())} {_quote(part.get_content_subtype().upper())} "
+              f"{param_list} NIL NIL {_quote(encoding)} {len(payload)}")
+    if part.get_content_maintype() == "text":
+        fields += " " + str(payload.count(b"\n"))
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_filename()
+        extra = f"({_quote('FILENAME')} {_quote(filename)})" if filename else "NIL"
+        fields += f" NIL ({_quote(disposition.upper())} {extra}) NIL NIL"
+    return f"({fields})"
+
+
+def _payload_bytes(part) -> bytes:
+    payload = part.get_payload()
+    if isinstance(payload, str):
+        return payload.encode("utf-8", "surrogateescape")
+    return part.as_bytes()
+
+
+def _section_part(msg, section: str):
+    part = msg
+    for index in section.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+        elif index != "1":
+            return None
+    return part
+
+
+def _header_fields(raw: bytes, fields: list[str]) -> bytes:
+    header_block = re.split(rb"\r?\n\r?\n", raw, maxsplit=1)[0]
+    wanted = {f.upper() for f in fields}
+    out = []
+    keep = False
+    for line in re.split(rb"\r?\n", header_block):
+        if line[:1] in (b" ", b"\t"):
+            if keep:
+                out.append(line)
+            continue
+        name = line.split(b":", 1)[0].decode(errors="ignore").upper()
+        keep = name in wanted
+        if keep:
+            out.append(line)
+    return b"\r\n".join(out) + b"\r\n\r\n"
+
+
+_FETCH_SECTION = re.compile(r"BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        # Avoid Nagle/delayed-ACK stalls distorting the simulated latency
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.folder = None
+        self.exists_seen = 0
+
+    def send(self, data: bytes) -> None:
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def handle(self):
+        self.send(b"* OK fake IMAP4rev1 ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            line = line.rstrip(b"\r\n").decode(errors="ignore")
+            if not line:
+                continue
+            tag, _, rest = line.partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            self.server.count_command(command)
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            uid_mode = command == "UID"
+            if uid_mode:
+                command, _, args = args.partition(" ")
+                command = command.upper()
+            handler = getattr(self, f"do_{command}", None)
+            if handler is None:
+                self.send(f"{tag} BAD unknown command {command}\r\n".encode())
+                continue
+            if handler(tag, args, uid_mode) is False:
+                return
+
+    def do_CAPABILITY(self, tag, args, uid_mode):
+        self.send(f"* CAPABILITY {' '.join(self.server.capabilities)}\r\n".encode())
+        self.send(f"{tag} OK CAPABILITY completed\r\n".encode())
+
+    def do_LOGIN(self, tag, args, uid_mode):
+        self.send(f"{tag} OK LOGIN completed\r\n".encode())
+
+    def report_exists(self) -> None:
+        exists = len(self.server.mailbox.folders.get(self.folder, []))
+        if exists != self.exists_seen:
+            self.exists_seen = exists
+            self.send(f"* {exists} EXISTS\r\n".encode())
+
+    def do_NOOP(self, tag, args, uid_mode):
+        self.report_exists()
+        self.send(f"{tag} OK NOOP completed\r\n".encode())
+
+    def do_IDLE(self, tag, args, uid_mode):
+        self.send(b"+ idling\r\n")
+        while True:
+            readable, _, _ = select.select([self.request], [], [], 0.05)
+            if readable:
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                if line.strip().upper() == b"DONE":
+                    break
+            self.report_exists()
+        self.send(f"{tag} OK IDLE terminated\r\n".encode())
+
+    def do_LOGOUT(self, tag, args, uid_mode):
+        self.send(b"* BYE logging out\r\n")
+        self.send(f"{tag} OK LOGOUT completed\r\n".encode())
+        return False
+
+    def do_SELECT(self, tag, args, uid_mode):
+        folder = args.strip().strip('"')
+        box = self.server.mailbox
+        if folder not in box.folders:
+            self.send(f"{tag} NO no such folder\r\n".encode())
+            return
+        self.folder = folder
+        with box.lock:
+            exists = len(box.folders[folder])
+            self.exists_seen = exists
+            self.send(f"* {exists} EXISTS\r\n".encode())
+            self.send(f"* OK [UIDVALIDITY {box.uidvalidity[folder]}] UIDs valid\r\n".encode())
+            self.send(f"* OK [UIDNEXT {box.next_uid[folder]}] next UID\r\n".encode())
+        self.send(f"{tag} OK [READ-WRITE] SELECT completed\r\n".encode())
+
+    do_EXAMINE = do_SELECT
+
+    def do_LIST(self, tag, args, uid_mode):
+        with self.server.mailbox.lock:
+            folders = sorted(self.server.mailbox.folders)
+        for folder in folders:
+            self.send(f'* LIST (\\HasNoChildren) "/" {_quote(folder)}\r\n'.encode())
+        self.send(f"{tag} OK LIST completed\r\n".encode())
+
+    def do_CREATE(self, tag, args, uid_mode):
+        folder = args.strip().strip('"')
+        if folder in self.server.mailbox.folders:
+            self.send(f"{tag} NO [ALREADYEXISTS] folder exists\r\n".encode())
+            return
+        self.server.mailbox.create(folder)
+        self.send(f"{tag} OK CREATE completed\r\n".encode())
+
+    def selected(self, spec: str, uid_mode: bool) -> list[list]:
+        """Return the messages of the selected folder matching a sequence or UID set."""
+        messages = self.server.mailbox.folders.get(self.folder, [])
+        highest = (messages[-1][0] if uid_mode else len(messages)) if messages else 0
+        ranges = _parse_sequence_set(spec, highest)
+        return [m for seq, m in enumerate(messages, start=1) if _in_ranges(m[0] if uid_mode else seq, ranges)]
+
+    def expunge(self, entries: list[list]) -> None:
+        """Remove `entries` from the selected folder, announcing each removal."""
+        messages = self.server.mailbox.folders.get(self.folder, [])
+        doomed = {id(entry) for entry in entries}
+        for seq in range(len(messages), 0, -1):
+            if id(messages[seq - 1]) in doomed:
+                del messages[seq - 1]
+                self.send(f"* {seq} EXPUNGE\r\n".encode())
+        self.exists_seen = len(messages)
+
+    def do_COPY(self, tag, args, uid_mode, move=False):
+        spec, _, target = args.partition(" ")
+        target = target.strip().strip('"')
+        box = self.server.mailbox
+        if target not in box.folders:
+            self.send(f"{tag} NO [TRYCREATE] no such folder\r\n".encode())
+            return
+        entries = self.selected(spec, uid_mode)
+        with box.lock:
+            for _, raw, flags in entries:
+                uid = box.next_uid[target]
+                box.next_uid[target] = uid + 1
+                box.folders[target].append([uid, raw, set(flags) - {"\\Deleted"}])
+            if move:
+                self.expunge(entries)
+        self.send(f"{tag} OK {'MOVE' if move else 'COPY'} completed\r\n".encode())
+
+    def do_MOVE(self, tag, args, uid_mode):
+        if "MOVE" not in self.server.capabilities:
+            self.send(f"{tag} BAD unknown command MOVE\r\n".encode())
+            return
+        self.do_COPY(tag, args, uid_mode, move=True)
+
+    def do_STORE(self, tag, args, uid_mode):
+        spec, _, rest = args.partition(" ")
+        action, _, flag_list = rest.partition(" ")
+        action = action.upper()
+        new_flags = set(flag_list.strip().strip("()").split())
+        with self.server.mailbox.lock:
+            for entry in self.selected(spec, uid_mode):
+                if action.startswith("+"):
+                    entry[2] |= new_flags
+                elif action.startswith("-"):
+                    entry[2] -= new_flags
+                else:
+                    entry[2] = set(new_flags)
+        self.send(f"{tag} OK STORE completed\r\n".encode())
+
+    def do_EXPUNGE(self, tag, args, uid_mode):
+        if uid_mode and "UIDPLUS" not in self.server.capabilities:
+            self.send(f"{tag} BAD unknown command EXPUNGE\r\n".encode())
+            return
+        messages = self.server.mailbox.folders.get(self.folder, [])
+        candidates = self.selected(args.strip(), True) if uid_mode else messages
+        with self.server.mailbox.lock:
+            self.expunge([m for m in candidates if "\\Deleted" in m[2]])
+        self.send(f"{tag} OK EXPUNGE completed\r\n".encode())
+
+    def do_SEARCH(self, tag, args, uid_mode):
+        messages = self.server.mailbox.folders.get(self.folder, [])
+        tokens = args.split()
+        since = None
+        uid_ranges = None
+        highest_uid = messages[-1][0] if messages else 0
+        for i, token in enumerate(tokens):
+            upper = token.upper()
+            if upper == "SINCE" and i + 1 < len(tokens):
+                day, month, year = tokens[i + 1].split("-")
+                since = datetime(int(year), _SEARCH_MONTHS[month], int(day), tzinfo=timezone.utc)
+            elif upper == "UID" and i + 1 < len(tokens):
+                uid_ranges = _parse_sequence_set(tokens[i + 1], highest_uid)
+        hits = []
+        for seq, (uid, raw, _flags) in enumerate(messages, start=1):
+            if uid_ranges is not None and not _in_ranges(uid, uid_ranges):
+                continue
+            if since is not None:
+                date = _message_date(raw)
+                if date is not None and date < since:
+                    continue
+            hits.append(uid if uid_mode else seq)
+        self.send(("* SEARCH " + " ".join(str(h) for h in hits)).rstrip().encode() + b"\r\n")
+        self.send(f"{tag} OK SEARCH completed\r\n".encode())
+
+    def do_FETCH(self, tag, args, uid_mode):
+        spec, _, items = args.partition(" ")
+        items = items.upper()
+        messages = self.server.mailbox.folders.get(self.folder, [])
+        highest = (messages[-1][0] if uid_mode else len(messages)) if messages else 0
+        ranges = _parse_sequence_set(spec, highest)
+        for seq, (uid, raw, flags) in enumerate(messages, start=1):
+            if not _in_ranges(uid if uid_mode else seq, ranges):
+                continue
+            out = f"* {seq} FETCH (UID {uid}".encode()
+            if re.search(r"\bRFC822\b", items):
+                out += b" RFC822 {" + str(len(raw)).encode() + b"}\r\n" + raw
+                self.server.bytes_sent += len(raw)
+                flags.add("\\Seen")
+            for section, origin, count in _FETCH_SECTION.findall(items):
+                if section.startswith("HEADER.FIELDS"):
+                    data = _header_fields(raw, section[section.index("(") + 1:section.rindex(")")].split())
+                elif section == "":
+                    data = raw
+                else:
+                    part = _section_part(self.server.parsed(self.folder, uid, raw), section)
+                    data = _payload_bytes(part) if part is not None else b""
+                key = f"BODY[{section}]"
+                if origin:
+                    data = data[int(origin):int(origin) + int(count)]
+                    key += f"<{origin}>"
+                out += f" {key} {{{len(data)}}}\r\n".encode() + data
+                self.server.bytes_sent += len(data)
+            if "BODYSTRUCTURE" in items:
+                structure = _bodystructure(self.server.parsed(self.folder, uid, raw)).encode()
+                out += b" BODYSTRUCTURE " + structure
+                self.server.bytes_sent += len(structure)
+            self.send(out + b")\r\n")
+        self.send(f"{tag} OK FETCH completed\r\n".encode())
+
+
+class FakeImapServer(socketserver.ThreadingTCPServer):
+    """Threaded fake IMAP server bound to localhost on an ephemeral port.
+
+    Use as a context manager; the server runs in a daemon thread until exit.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, mailbox: Mailbox | None = None, latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.mailbox = mailbox or Mailbox()
+        self.latency = latency
+        self.capabilities = ["IMAP4rev1", "IDLE", "MOVE", "UIDPLUS"]
+        self.commands: dict[str, int] = {}
+        self.bytes_sent = 0
+        self._stats_lock = threading.Lock()
+        self._parsed = {}
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def parsed(self, folder: str, uid: int, raw: bytes):
+        """Return the parsed message, caching it so server-side parsing does not skew timings."""
+        key = (folder, uid)
+        if key not in self._parsed:
+            self._parsed[key] = message_from_bytes(raw)
+        return self._parsed[key]
+
+    def count_command(self, command: str) -> None:
+        with self._stats_lock:
+            self.commands[command] = self.commands.get(command, 0) + 1
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self.commands.clear()
+            self.bytes_sent = 0
+
+    def total_commands(self) -> int:
+        with self._stats_lock:
+            return sum(self.commands.values())
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
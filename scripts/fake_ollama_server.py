@@ -0,0 +1,108 @@
+# scripts/fake_ollama_server.py
+"""
+In-process stand-in for the Ollama /api/generate endpoint.
+- Replies with a fixed JSON classification after a configurable latency + jitter,
+  plus an optional cost per 1000 prompt characters (prompt processing on CPU)
+- Answers batched prompts (emails in ```email id="..."``` blocks) with one result per id
+- Serves at most `parallel` requests at once, like OLLAMA_NUM_PARALLEL
+- Speaks HTTP/1.1 keep-alive and counts requests and TCP connections
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = {
+    "category": "application_acknowledged",
+    "confidence": 0.9,
+    "rationale": "Fake reply",
+    "employer_or_recruiter": None,
+    "job_title": None,
+}
+
+_BATCH_ID = re.compile(r'```email id="([^"]+)"')
+
+
+def default_responder(request: dict):
+    """Return the fixed reply, or a {"results": [...]} array for batched prompts."""
+    ids = _BATCH_ID.findall(request.get("prompt", ""))
+    if ids:
+        return {"results": [dict(DEFAULT_REPLY, id=email_id) for email_id in ids]}
+    return DEFAULT_REPLY
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.count("requests")
+        with self.server.slots:
+            delay = (self.server.latency + random.uniform(0, self.server.jitter)
+                     + len(request.get("prompt", "")) / 1000 * self.server.per_kchar)
+            time.sleep(delay)
+        reply = self.server.responder(request)
+        body = json.dumps({
+            "model": request.get("model"),
+            "response": reply if isinstance(reply, str) else json.dumps(reply),
+            "done": True,
+            "prompt_eval_count": len(request.get("prompt", "")) // 4,
+            "eval_count": 40,
+            "total_duration": int(delay * 1e9),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Fake Ollama bound to localhost on an ephemeral port; use as a context manager.
+
+    `responder(request_json)` may be supplied to vary replies (dict or raw string).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, parallel: int = 4, responder=None,
+                 per_kchar: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.per_kchar = per_kchar
+        self.slots = threading.Semaphore(parallel)
+        self.responder = responder or default_responder
+        self.stats = {"requests": 0, "connections": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/generate"
+
+    def count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self.stats = {"requests": 0, "connections": 0}
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -13,6 +13,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.llm.classify import classify_email
 from src.imap.parser import parse_rfc822
+from src.llm.condense import condense_body, estimate_tokens
 
 def preview_text(text: str, length: int = 120) -> str:
     """Return first `length` characters of text for preview"""
@@ -49,6 +50,8 @@ def main():
         print(f"SUBJECT    : {parsed['subject']}")
         print(f"DATE       : {parsed['date']}")
         print(f"BODY LEN   : {len(parsed['body'])}")
+        condensed = condense_body(parsed["body"])
+        print(f"CONDENSED  : {len(condensed)} chars, ~{estimate_tokens(condensed)} tokens")
         print(f"CLASSIFICATION:\n{classification}")
         print(f"PREVIEW    : {body_preview}")
 
@@ -0,0 +1,197 @@
+# imap/actions.py
+"""
+Responsibilities:
+- Act on classified mail on the server: move it to a per-category folder, or flag it
+- Batch: group messages by source folder and target, and issue ONE command per group
+  (UID MOVE, or UID COPY + UID STORE +FLAGS (\\Deleted) + UID EXPUNGE when the server
+  lacks MOVE; UID STORE +FLAGS in flag mode)
+- Create missing target folders once, from a cached folder list
+- Best effort: a failed batch is reported and dropped, never fatal to classification
+- No fetching, parsing or classification here
+
+Usage Context for Qwen 3 Coder:
+- target_folder(category, prefix=ACTION_FOLDER_PREFIX) -> str | None
+    None for not_relevant and errors: that mail stays where it is
+- list_folders(mail) -> set[str]
+- move_uids(mail, uids, target) / flag_uids(mail, uids, flags)
+    Work on a logged-in connection with the source folder selected read-write
+- actions = ActionBatcher(session, mode=ACTION_MODE, batch_size=ACTION_BATCH_SIZE, max_delay=ACTION_MAX_DELAY)
+    `session(account)` returns a context manager giving a logged-in connection,
+    e.g. EmailClient.action_session
+    actions.add(record)  -> queue a pipeline record ({"account", "folder", "uid", "classification"})
+    actions.close()      -> apply everything still queued and stop
+    actions.stats        -> {"messages": int, "commands": int, "failed": int}
+    Batches are applied once `batch_size` messages are queued or the oldest has
+    waited `max_delay` seconds, so watch mode still acts within seconds
+- mode defaults to EMAIL_ACTION_MODE: "move", "flag" or "none" (default)
+- prefix defaults to EMAIL_ACTION_FOLDER_PREFIX or "Jobs/"
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+
+from .client import _uid_set
+
+ACTION_MODE = os.environ.get("EMAIL_ACTION_MODE", "none")
+ACTION_FOLDER_PREFIX = os.environ.get("EMAIL_ACTION_FOLDER_PREFIX", "Jobs/")
+ACTION_BATCH_SIZE = int(os.environ.get("EMAIL_ACTION_BATCH_SIZE", 100))
+ACTION_MAX_DELAY = float(os.environ.get("EMAIL_ACTION_MAX_DELAY", 5.0))
+
+CATEGORY_FOLDERS = {
+    "application_acknowledged": "Acknowledged",
+    "application_rejected": "Rejected",
+    "job_opportunity": "Opportunities",
+}
+
+_LIST_LINE = re.compile(rb'^\((?P<flags>[^)]*)\) (?:"(?:[^"\\]|\\.)*"|NIL) (?P<name>.+)$')
+_STOP = object()
+
+
+def target_folder(category, prefix=ACTION_FOLDER_PREFIX):
+    """Return the folder mail of `category` belongs in, or None to leave it alone."""
+    name = CATEGORY_FOLDERS.get(category)
+    return f"{prefix}{name}" if name else None
+
+
+def _quote(name):
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _check(response, action):
+    status, data = response
+    if status != "OK":
+        raise Exception(f"{action} failed: {status} {data}")
+    return data
+
+
+def list_folders(mail) -> set[str]:
+    """Return the names of every folder of the account."""
+    folders = set()
+    for line in _check(mail.list(), "LIST"):
+        if isinstance(line, tuple):
+            # Name sent as a literal: ('... {n}', b'name')
+            folders.add(line[1].decode(errors="ignore"))
+            continue
+        match = _LIST_LINE.match(line or b"")
+        if match and b"\\Noselect" not in match.group("flags"):
+            name = match.group("name").decode(errors="ignore")
+            if name.startswith('"'):
+                name = name[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+            folders.add(name)
+    return folders
+
+
+def move_uids(mail, uids, target) -> None:
+    """Move `uids` of the selected folder to `target` with as few commands as the server allows."""
+    uid_set = _uid_set(uids)
+    if "MOVE" in mail.capabilities:
+        _check(mail.uid("MOVE", uid_set, _quote(target)), "UID MOVE")
+        return
+    _check(mail.uid("COPY", uid_set, _quote(target)), "UID COPY")
+    _check(mail.uid("STORE", uid_set, "+FLAGS.SILENT", "(\\Deleted)"), "UID STORE")
+    if "UIDPLUS" in mail.capabilities:
+        # Only expunge what we moved, not other mail already marked \Deleted
+        _check(mail.uid("EXPUNGE", uid_set), "UID EXPUNGE")
+    else:
+        _check(mail.expunge(), "EXPUNGE")
+
+
+def flag_uids(mail, uids, flags) -> None:
+    """Add `flags` (e.g. "$application_rejected" or "\\Flagged") to `uids` of the selected folder."""
+    flags = flags if isinstance(flags, str) else " ".join(flags)
+    _check(mail.uid("STORE", _uid_set(uids), "+FLAGS.SILENT", f"({flags})"), "UID STORE")
+
+
+class ActionBatcher:
+    """Queue classified records and apply them to the server in grouped batches."""
+
+    def __init__(self, session, mode=ACTION_MODE, batch_size=ACTION_BATCH_SIZE, max_delay=ACTION_MAX_DELAY,
+                 prefix=ACTION_FOLDER_PREFIX):
+        if mode not in ("move", "flag", "none"):
+            raise Exception(f"Unknown action mode: {mode}")
+        self.session = session
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self.prefix = prefix
+        self.stats = {"messages": 0, "commands": 0, "failed": 0}
+        self._folders = {}  # account -> set of known folder names
+        self._queue = queue.Queue()
+        self._thread = None
+        if mode != "none":
+            self._thread = threading.Thread(target=self._run, name="imap-actions", daemon=True)
+            self._thread.start()
+
+    def _target(self, category):
+        if self.mode == "move":
+            return target_folder(category, self.prefix)
+        # Keywords may not contain spaces or specials; categories are plain identifiers
+        return f"${category}" if category in CATEGORY_FOLDERS else None
+
+    def add(self, record) -> None:
+        """Queue a classified record; records without a UID or a target are ignored."""
+        if self._thread is None or record.get("uid") is None or "error" in record:
+            return
+        target = self._target((record.get("classification") or {}).get("category"))
+        if target is not None:
+            self._queue.put((record["account"], record["folder"], target, record["uid"]))
+
+    def close(self) -> None:
+        """Apply everything still queued, then stop the worker."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        pending = {}
+        count = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _STOP:
+                account, folder, target, uid = item
+                pending.setdefault((account, folder), {}).setdefault(target, []).append(uid)
+                count += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_delay
+            if pending and (item is None or item is _STOP or count >= self.batch_size):
+                self._apply(pending)
+                pending, count, deadline = {}, 0, None
+            if item is _STOP:
+                return
+
+    def _apply(self, pending):
+        for (account, folder), groups in pending.items():
+            try:
+                with self.session(account) as mail:
+                    _check(mail.select(_quote(folder)), f"SELECT {folder}")
+                    for target, uids in groups.items():
+                        self._apply_group(mail, account, target, uids)
+            except Exception as e:
+                self.stats["failed"] += sum(len(uids) for uids in groups.values())
+                print(f"IMAP action failed for {account}/{folder}: {e}")
+
+    def _apply_group(self, mail, account, target, uids):
+        if self.mode == "flag":
+            flag_uids(mail, uids, target)
+            self.stats["commands"] += 1
+        else:
+            known = self._folders.get(account)
+            if known is None:
+                known = self._folders[account] = list_folders(mail)
+                self.stats["commands"] += 1
+            if target not in known:
+                _check(mail.create(_quote(target)), f"CREATE {target}")
+                known.add(target)
+                self.stats["commands"] += 1
+            move_uids(mail, uids, target)
+            self.stats["commands"] += 1 if "MOVE" in mail.capabilities else 3
+        self.stats["messages"] += len(uids)
@@ -0,0 +1,97 @@
+# imap/bodystructure.py
+"""
+Responsibilities:
+- Parse IMAP BODYSTRUCTURE responses into nested Python lists
+- Locate the text part worth downloading (text/plain, else text/html)
+- No network access; works purely on bytes returned by the server
+
+Usage Context for Qwen 3 Coder:
+- parse_bodystructure(data: bytes) -> list
+    Atoms and quoted strings become str, NIL becomes None, parenthesised lists become lists
+- find_text_part(structure: list) -> dict | None
+    Returns {"part": "1.2", "subtype": "plain", "charset": "utf-8", "encoding": "base64", "size": 1234}
+    Attachments and embedded message/rfc822 parts are never selected
+"""
+
+
+def parse_bodystructure(data: bytes) -> list:
+    """Parse a parenthesised BODYSTRUCTURE expression into nested lists."""
+    stack = [[]]
+    i = 0
+    length = len(data)
+    while i < length:
+        ch = data[i:i + 1]
+        if ch == b"(":
+            stack.append([])
+            i += 1
+        elif ch == b")":
+            if len(stack) == 1:
+                raise ValueError("Unbalanced BODYSTRUCTURE")
+            done = stack.pop()
+            stack[-1].append(done)
+            i += 1
+        elif ch in (b" ", b"\r", b"\n"):
+            i += 1
+        elif ch == b'"':
+            i += 1
+            value = bytearray()
+            while i < length and data[i:i + 1] != b'"':
+                if data[i:i + 1] == b"\\":
+                    i += 1
+                value += data[i:i + 1]
+                i += 1
+            stack[-1].append(value.decode(errors="ignore"))
+            i += 1
+        else:
+            start = i
+            while i < length and data[i:i + 1] not in (b" ", b"(", b")", b"\r", b"\n"):
+                i += 1
+            atom = data[start:i].decode(errors="ignore")
+            stack[-1].append(None if atom.upper() == "NIL" else atom)
+    if len(stack) != 1 or not stack[0]:
+        raise ValueError("Unbalanced BODYSTRUCTURE")
+    return stack[0][0]
+
+
+def _params(value) -> dict:
+    if not isinstance(value, list):
+        return {}
+    return {str(k).lower(): v for k, v in zip(value[::2], value[1::2])}
+
+
+def _is_attachment(part: list) -> bool:
+    # Text parts carry a line count, so disposition sits at index 9
+    disposition = part[9] if len(part) > 9 else None
+    return isinstance(disposition, list) and str(disposition[0]).lower() == "attachment"
+
+
+def _walk(structure: list, number: str):
+    """Yield (part_number, leaf) for every non-multipart leaf."""
+    if structure and isinstance(structure[0], list):
+        index = 0
+        for child in structure:
+            if not isinstance(child, list):
+                break
+            index += 1
+            yield from _walk(child, f"{number}.{index}" if number else str(index))
+    else:
+        # A single-part message is addressed as section 1
+        yield number or "1", structure
+
+
+def find_text_part(structure: list) -> dict | None:
+    """Return the best text part to download, preferring text/plain over text/html."""
+    candidates = {}
+    for number, part in _walk(structure, ""):
+        if len(part) < 7 or str(part[0]).lower() != "text" or _is_attachment(part):
+            continue
+        subtype = str(part[1]).lower()
+        if subtype in ("plain", "html") and subtype not in candidates:
+            candidates[subtype] = {
+                "part": number,
+                "subtype": subtype,
+                "charset": _params(part[2]).get("charset") or "utf-8",
+                "encoding": str(part[5] or "7bit").lower(),
+                "size": int(part[6]) if str(part[6]).isdigit() else 0,
+            }
+    return candidates.get("plain") or candidates.get("html")
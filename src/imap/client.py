@@ -3,83 +3,636 @@
 Responsibilities:
 - Connect to IMAP via SSL
 - Fetch unread emails from folder specified in .env (default: INBOX)
+- Fetch in batches of UIDs per UID FETCH command to avoid one round-trip per message
+- Optionally fetch lazily: headers + BODYSTRUCTURE first, then only the text part, capped
+- Sync incrementally: remember UIDVALIDITY and the last processed UID per folder
+- EmailClient: fetch several folders and/or accounts concurrently over a bounded
+  connection pool, merged into one stream
+- Watch a folder over one long-lived session using IMAP IDLE (polling fallback),
+  with keepalive and automatic reconnect
 - Return raw RFC822 bytes, no parsing
 - Fail fast on connection or fetch errors
 
 Usage Context for Qwen 3 Coder:
 - fetch_unread_email(host, port, username, password, folder=None) -> bytes | None
-- fetch_all_unread_emails(host, port, username, password, folder=None) -> list[bytes]
+- fetch_all_unread_emails(host, port, username, password, folder=None, batch_size=FETCH_BATCH_SIZE) -> list[bytes]
+- iter_unread_emails(host, port, username, password, folder=None, batch_size=FETCH_BATCH_SIZE) -> Iterator[bytes]
+    Yields messages batch by batch as they arrive instead of building a list
+- iter_new_emails(host, port, username, password, folder=None, state_path=STATE_FILE) -> Iterator[bytes]
+    Only yields mail newer than the last processed UID (UID <last+1>:*); falls back to
+    a full `since_days` resync on the first poll or when UIDVALIDITY changes
+- fetch_new_emails(...) -> list[bytes], list form of iter_new_emails
+- watch_new_emails(host, port, username, password, folder=None) -> Iterator[bytes]
+    Never returns: yields new mail within seconds of arrival. Logs in once, then
+    IDLEs between syncs (NOOP keepalive and re-IDLE every IDLE_TIMEOUT seconds);
+    servers without IDLE are polled every POLL_INTERVAL seconds on the same session.
+    Dropped connections are re-established with exponential backoff
+- idle_wait(mail, timeout) -> bool, True when the server announced new mail
+- EmailClient(accounts=None, max_connections=MAX_CONNECTIONS)
+    accounts: list of {"host", "port", "username", "password", "folders": [...]}; defaults
+    to a single account from EMAIL_HOST/EMAIL_PORT/EMAIL_USER/EMAIL_PASS with the
+    comma-separated folders in EMAIL_FOLDER
+    client.connect()          -> opens one pooled connection per account (fail fast)
+    client.iter_unread()      -> Iterator[dict] of {"account", "folder", "source", "uid", "raw"}, new mail only
+                                 ("source" is the folder_key); with journal=ProgressJournal(), UIDs an
+                                 interrupted run never stored are fetched again
+    client.fetch_unread()     -> list form of iter_unread
+    client.watch()            -> like iter_unread but never returns (IDLE per folder); mail that
+                                 failed in the pipeline is fetched again on the next sync
+    client.action_session(username) -> context manager, connection for imap/actions.py
+    client.logout()
+- search_uids(mail, since_days) / iter_fetch_batched(mail, uids, batch_size)
+    Lower-level helpers working on an already logged-in, selected imaplib connection
+- fetch_mode="full" downloads RFC822; fetch_mode="lazy" downloads only the selected header
+  fields and the text/plain (else text/html) section up to BODY_BYTE_CAP bytes, and returns
+  a minimal RFC822 message that parse_rfc822 accepts unchanged. Lazy mode uses BODY.PEEK and
+  does not set \\Seen
 - folder defaults to EMAIL_FOLDER environment variable or "INBOX"
+- batch_size defaults to EMAIL_FETCH_BATCH_SIZE environment variable or 200
+- fetch_mode defaults to EMAIL_FETCH_MODE environment variable or "full"
 """
 
 import imaplib
+import queue
+import re
+import select
 import ssl
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
+from .pool import ConnectionPool
+from .bodystructure import parse_bodystructure, find_text_part
+from .sync_state import STATE_FILE, folder_key, load_state, save_entry
+
 load_dotenv()
 DEFAULT_FOLDER = os.environ.get("EMAIL_FOLDER", "INBOX")  # Gmail requires uppercase INBOX
 
 SINCE_DAYS = 30  # Only fetch emails from last 45 days to limit volume
 
-def fetch_unread_email(host, port, username, password, folder=None, since_days=SINCE_DAYS):
-    """Fetch one unread email from folder, optionally only from last `since_days` days."""
-    folder = folder or DEFAULT_FOLDER
+# UIDs per UID FETCH command; a few hundred keeps responses manageable while
+# turning thousands of round-trips into a handful
+FETCH_BATCH_SIZE = int(os.environ.get("EMAIL_FETCH_BATCH_SIZE", 200))
+
+# "full" downloads RFC822; "lazy" downloads headers, structure and one text part
+FETCH_MODE = os.environ.get("EMAIL_FETCH_MODE", "full")
+# Maximum bytes of the text part downloaded in lazy mode
+BODY_BYTE_CAP = int(os.environ.get("EMAIL_BODY_BYTE_CAP", 64 * 1024))
+# RFC 2177: servers may drop an IDLE after 30 minutes, so re-IDLE well before that
+IDLE_TIMEOUT = int(os.environ.get("EMAIL_IDLE_TIMEOUT", 25 * 60))
+# Used when the server does not advertise IDLE
+POLL_INTERVAL = int(os.environ.get("EMAIL_POLL_INTERVAL", 300))
+MAX_RECONNECT_DELAY = 300
+# Connections per account; Gmail allows 15 simultaneous IMAP sessions
+MAX_CONNECTIONS = int(os.environ.get("EMAIL_MAX_CONNECTIONS", 4))
+# Only the headers parse_rfc822 and downstream dedupe need
+HEADER_FIELDS = ("SUBJECT", "FROM", "TO", "DATE", "MESSAGE-ID", "IN-REPLY-TO", "REFERENCES")
+
+_FETCH_START = re.compile(rb"^\d+ \(")
+_FETCH_UID = re.compile(rb"UID (\d+)")
+_LITERAL_KEY = re.compile(rb"([A-Z0-9.]+(?:\[[^\]]*\])?(?:<\d+>)?) \{\d+\}$", re.I)
+_BODYSTRUCTURE = re.compile(rb"BODYSTRUCTURE \(", re.I)
+
+
+def _connect(host, port, username, password):
+    """Open an SSL IMAP connection and log in."""
     context = ssl.create_default_context()
-    with imaplib.IMAP4_SSL(host, port, ssl_context=context) as mail:
-        mail.login(username, password)
-        status, _ = mail.select(folder)
+    mail = imaplib.IMAP4_SSL(host, port, ssl_context=context)
+    mail.login(username, password)
+    return mail
+
+
+def _select_folder(mail, folder):
+    """Select `folder` and return its UIDVALIDITY (None if the server omits it)."""
+    status, _ = mail.select(folder)
+    if status != "OK":
+        raise Exception(f"Failed to select folder '{folder}'. Status: {status}")
+    _, data = mail.response("UIDVALIDITY")
+    return int(data[-1]) if data and data[-1] else None
+
+
+def _search_criteria(since_days):
+    # criteria = ["UNSEEN"]
+    criteria = []
+    if since_days is not None:
+        since_date = (datetime.now() - timedelta(days=since_days)).strftime("%d-%b-%Y")
+        criteria.append(f'SINCE {since_date}')
+    return criteria or ["ALL"]
+
+
+def _uid_set(uids):
+    """Compress a list of UIDs into an IMAP sequence set, e.g. 1:5,8,10:12."""
+    numbers = sorted(int(u) for u in uids)
+    ranges = []
+    start = prev = numbers[0]
+    for n in numbers[1:]:
+        if n == prev + 1:
+            prev = n
+            continue
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+        start = prev = n
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    return ",".join(ranges)
+
+
+def _parse_fetch_response(data):
+    """Split an imaplib FETCH response into (uid, {item: literal bytes}) pairs.
+
+    A message may span several tuples when more than one literal is requested,
+    and servers may place UID before or after the literals.
+    """
+    messages = []
+    current = None
+    for element in data:
+        if isinstance(element, tuple):
+            prefix, literal = element
+        else:
+            prefix, literal = element, None
+        if prefix is None:
+            continue
+        if _FETCH_START.match(prefix):
+            current = {"meta": b"", "items": {}}
+            messages.append(current)
+        if current is None:
+            continue
+        current["meta"] += prefix
+        if literal is not None:
+            match = _LITERAL_KEY.search(prefix)
+            if match:
+                current["items"][match.group(1).upper().decode()] = literal
+            else:
+                # A literal inside BODYSTRUCTURE (e.g. a filename); keep it as a quoted string
+                current["meta"] += b'"' + literal.replace(b"\\", b"\\\\").replace(b'"', b'\\"') + b'"'
+
+    results = []
+    for message in messages:
+        uid = _FETCH_UID.search(message["meta"])
+        structure = _extract_bodystructure(message["meta"])
+        if structure is not None:
+            message["items"]["BODYSTRUCTURE"] = structure
+        # Unsolicited FLAGS updates carry no literals; skip them
+        if uid and message["items"]:
+            results.append((int(uid.group(1)), message["items"]))
+    return results
+
+
+def _extract_bodystructure(meta):
+    """Return the balanced parenthesised BODYSTRUCTURE value from FETCH metadata."""
+    match = _BODYSTRUCTURE.search(meta)
+    if not match:
+        return None
+    start = match.end() - 1
+    depth = 0
+    in_quote = False
+    i = start
+    while i < len(meta):
+        ch = meta[i:i + 1]
+        if in_quote:
+            if ch == b"\\":
+                i += 1
+            elif ch == b'"':
+                in_quote = False
+        elif ch == b'"':
+            in_quote = True
+        elif ch == b"(":
+            depth += 1
+        elif ch == b")":
+            depth -= 1
+            if depth == 0:
+                return meta[start:i + 1]
+        i += 1
+    return None
+
+
+def search_uids(mail, since_days=SINCE_DAYS):
+    """Return the UIDs matching the search window in the selected folder."""
+    status, messages = mail.uid("SEARCH", None, *_search_criteria(since_days))
+    if status != "OK":
+        raise Exception("Failed to search emails")
+    return messages[0].split()
+
+
+def search_new_uids(mail, last_uid):
+    """Return the UIDs above `last_uid` in the selected folder."""
+    status, messages = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+    if status != "OK":
+        raise Exception("Failed to search emails")
+    # `n:*` always matches the highest UID, even when it is below n
+    return [uid for uid in messages[0].split() if int(uid) > last_uid]
+
+
+def sync_folder(mail, folder, key, since_days=SINCE_DAYS, batch_size=FETCH_BATCH_SIZE,
+                state_path=STATE_FILE, fetch_mode=FETCH_MODE, reselect=True, retry_uids=()):
+    """Yield (uid, raw) pairs for mail the folder has received since the last sync.
+
+    `mail` is a logged-in connection; `key` identifies the folder in the state
+    file (see `folder_key`). The folder's UIDVALIDITY is compared against the
+    saved state; pass reselect=False when the folder is still selected from a
+    previous sync on the same session. A UID is recorded as processed once the
+    consumer asks for the next message; progress is saved after each batch and
+    when the generator finishes or is closed. `retry_uids` (e.g. mail an
+    interrupted run fetched but never finished) are fetched again along with
+    the new mail, unless UIDVALIDITY changed and the folder is resynced anyway.
+    """
+    entry = load_state(state_path).get(key)
+    if reselect or not entry:
+        uidvalidity = _select_folder(mail, folder)
+    else:
+        uidvalidity = entry.get("uidvalidity")
+    if entry and entry.get("uidvalidity") == uidvalidity:
+        uids = search_new_uids(mail, entry["last_uid"])
+        if retry_uids:
+            retry = {int(uid) for uid in retry_uids if int(uid) <= entry["last_uid"]}
+            uids = sorted(retry | {int(uid) for uid in uids})
+    else:
+        # First poll or the server renumbered the folder: full resync
+        entry = {"uidvalidity": uidvalidity, "last_uid": 0}
+        uids = search_uids(mail, since_days)
+
+    batch_size = max(1, batch_size)
+    try:
+        for start in range(0, len(uids), batch_size):
+            for uid, raw in iter_fetch_batched(mail, uids[start:start + batch_size], batch_size, fetch_mode):
+                yield uid, raw
+                entry["last_uid"] = max(entry["last_uid"], uid)
+            save_entry(key, entry, state_path)
+    finally:
+        save_entry(key, entry, state_path)
+
+
+def _build_lazy_message(header, text_part, body, byte_cap):
+    """Assemble a minimal RFC822 message from fetched headers and one text section."""
+    header = header.rstrip(b"\r\n") + b"\r\n"
+    if text_part is None:
+        return header + b"Content-Type: text/plain\r\n\r\n"
+    if text_part["encoding"] == "base64" and len(body) >= byte_cap:
+        # Drop the trailing partial line so the truncated payload still decodes
+        body = body[:body.rfind(b"\n") + 1]
+    content_headers = (
+        f'Content-Type: text/{text_part["subtype"]}; charset="{text_part["charset"]}"\r\n'
+        f'Content-Transfer-Encoding: {text_part["encoding"]}\r\n\r\n'
+    ).encode()
+    return header + content_headers + body
+
+
+def _iter_fetch_lazy(mail, batch, byte_cap):
+    """Two-phase fetch of one batch: headers + structure, then capped text sections."""
+    header_item = f"BODY.PEEK[HEADER.FIELDS ({' '.join(HEADER_FIELDS)})]"
+    status, data = mail.uid("FETCH", _uid_set(batch), f"({header_item} BODYSTRUCTURE)")
+    if status != "OK":
+        raise Exception(f"Failed to fetch UIDs {_uid_set(batch)}")
+
+    headers = {}
+    text_parts = {}
+    for uid, parts in _parse_fetch_response(data):
+        headers[uid] = next((v for k, v in parts.items() if k.startswith("BODY[HEADER")), b"")
+        structure = parts.get("BODYSTRUCTURE")
+        text_parts[uid] = find_text_part(parse_bodystructure(structure)) if structure else None
+
+    # FETCH applies the same items to every UID, so group by section number
+    by_section = {}
+    for uid, text_part in text_parts.items():
+        if text_part is not None:
+            by_section.setdefault(text_part["part"], []).append(uid)
+
+    bodies = {}
+    for section, section_uids in by_section.items():
+        status, data = mail.uid("FETCH", _uid_set(section_uids), f"(BODY.PEEK[{section}]<0.{byte_cap}>)")
         if status != "OK":
-            raise Exception(f"Failed to select folder '{folder}'. Status: {status}")
+            raise Exception(f"Failed to fetch section {section} of UIDs {_uid_set(section_uids)}")
+        for uid, parts in _parse_fetch_response(data):
+            bodies[uid] = next((v for k, v in parts.items() if k.startswith(f"BODY[{section}]")), b"")
+
+    for uid in sorted(headers):
+        yield uid, _build_lazy_message(headers[uid], text_parts[uid], bodies.get(uid, b""), byte_cap)
 
-        # criteria = ["UNSEEN"]
-        criteria = []
-        if since_days is not None:
-            since_date = (datetime.now() - timedelta(days=since_days)).strftime("%d-%b-%Y")
-            criteria.append(f'SINCE {since_date}')
 
-        status, messages = mail.search(None, *criteria)
+def iter_fetch_batched(mail, uids, batch_size=FETCH_BATCH_SIZE, fetch_mode=FETCH_MODE):
+    """Yield (uid, raw) pairs, fetching `batch_size` UIDs per UID FETCH command."""
+    batch_size = max(1, batch_size)
+    for start in range(0, len(uids), batch_size):
+        batch = uids[start:start + batch_size]
+        if fetch_mode == "lazy":
+            yield from _iter_fetch_lazy(mail, batch, BODY_BYTE_CAP)
+            continue
+        status, data = mail.uid("FETCH", _uid_set(batch), "(RFC822)")
         if status != "OK":
-            raise Exception("Failed to search emails")
-        email_ids = messages[0].split()
-        if not email_ids:
+            raise Exception(f"Failed to fetch UIDs {_uid_set(batch)}")
+        for uid, parts in _parse_fetch_response(data):
+            yield uid, parts["RFC822"]
+
+
+def fetch_unread_email(host, port, username, password, folder=None, since_days=SINCE_DAYS,
+                       fetch_mode=FETCH_MODE):
+    """Fetch one unread email from folder, optionally only from last `since_days` days."""
+    folder = folder or DEFAULT_FOLDER
+    with _connect(host, port, username, password) as mail:
+        _select_folder(mail, folder)
+        uids = search_uids(mail, since_days)
+        if not uids:
             return None
-        email_id = email_ids[0]
-        status, msg = mail.fetch(email_id, "(RFC822)")
-        if status != "OK":
-            raise Exception(f"Failed to fetch email {email_id}")
-        return msg[0][1]
+        for _, raw in iter_fetch_batched(mail, uids[:1], fetch_mode=fetch_mode):
+            return raw
+        raise Exception(f"Failed to fetch email {uids[0]}")
 
 
-def fetch_all_unread_emails(host, port, username, password, folder=None, since_days=SINCE_DAYS):
-    """Fetch all unread emails from folder, optionally only from last `since_days` days."""
+def iter_unread_emails(host, port, username, password, folder=None, since_days=SINCE_DAYS,
+                       batch_size=FETCH_BATCH_SIZE, fetch_mode=FETCH_MODE):
+    """Yield unread emails from folder batch by batch, optionally only from last `since_days` days."""
     folder = folder or DEFAULT_FOLDER
-    context = ssl.create_default_context()
-    with imaplib.IMAP4_SSL(host, port, ssl_context=context) as mail:
-        mail.login(username, password)
-        status, _ = mail.select(folder)
-        if status != "OK":
-            raise Exception(f"Failed to select folder '{folder}'. Status: {status}")
+    with _connect(host, port, username, password) as mail:
+        _select_folder(mail, folder)
+        uids = search_uids(mail, since_days)
+        for _, raw in iter_fetch_batched(mail, uids, batch_size, fetch_mode):
+            yield raw
 
-        # criteria = ["UNSEEN"]
-        criteria = []
-        if since_days is not None:
-            since_date = (datetime.now() - timedelta(days=since_days)).strftime("%d-%b-%Y")
-            criteria.append(f'SINCE {since_date}')
 
-        status, messages = mail.search(None, *criteria)
-        if status != "OK":
-            raise Exception("Failed to search emails")
-
-        email_ids = messages[0].split()
-        if not email_ids:
-            return []
-
-        raw_emails = []
-        for email_id in email_ids:
-            status, msg = mail.fetch(email_id, "(RFC822)")
-            if status != "OK":
-                raise Exception(f"Failed to fetch email {email_id}")
-            raw_emails.append(msg[0][1])
-        return raw_emails
+def iter_new_emails(host, port, username, password, folder=None, since_days=SINCE_DAYS,
+                    batch_size=FETCH_BATCH_SIZE, state_path=STATE_FILE, fetch_mode=FETCH_MODE):
+    """Yield only emails that arrived since the previous poll of this folder."""
+    folder = folder or DEFAULT_FOLDER
+    with _connect(host, port, username, password) as mail:
+        for _, raw in sync_folder(mail, folder, folder_key(host, username, folder), since_days, batch_size,
+                                  state_path, fetch_mode):
+            yield raw
+
+
+def fetch_new_emails(host, port, username, password, folder=None, since_days=SINCE_DAYS,
+                     batch_size=FETCH_BATCH_SIZE, state_path=STATE_FILE, fetch_mode=FETCH_MODE):
+    """Fetch only emails that arrived since the previous poll of this folder."""
+    return list(iter_new_emails(host, port, username, password, folder, since_days, batch_size, state_path,
+                                fetch_mode))
+
+
+def _has_buffered_data(mail):
+    """Return True if a response is already buffered locally (TLS or file buffer)."""
+    pending = getattr(mail.sock, "pending", None)
+    if pending and pending():
+        return True
+    timeout = mail.sock.gettimeout()
+    mail.sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLError, OSError):
+        return False
+    finally:
+        mail.sock.settimeout(timeout)
+
+
+def idle_wait(mail, timeout=IDLE_TIMEOUT):
+    """Block in IDLE until the server reports new mail or `timeout` seconds pass.
+
+    Returns True when an EXISTS/RECENT update arrived, False on timeout.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b" IDLE\r\n")
+    line = mail.readline()
+    if not line.startswith(b"+"):
+        raise Exception(f"Server refused IDLE: {line!r}")
+
+    has_mail = False
+    deadline = time.monotonic() + timeout
+    while not has_mail:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if not _has_buffered_data(mail) and not select.select([mail.sock], [], [], remaining)[0]:
+            break
+        line = mail.readline()
+        if not line or line.startswith(b"* BYE"):
+            raise imaplib.IMAP4.abort(f"Connection closed during IDLE: {line!r}")
+        has_mail = line.startswith(b"*") and (b"EXISTS" in line or b"RECENT" in line)
+
+    mail.send(b"DONE\r\n")
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("Connection closed while ending IDLE")
+        if line.startswith(tag):
+            if not line[len(tag):].strip().startswith(b"OK"):
+                raise Exception(f"IDLE failed: {line!r}")
+            return has_mail
+
+
+def _watch_folder(session, folder, key, since_days=SINCE_DAYS, batch_size=FETCH_BATCH_SIZE,
+                  state_path=STATE_FILE, fetch_mode=FETCH_MODE, idle_timeout=IDLE_TIMEOUT,
+                  poll_interval=POLL_INTERVAL, retry_uids=()):
+    """Yield (uid, raw) pairs forever; `session()` returns a context manager giving a logged-in connection.
+
+    `retry_uids` may be a callable, asked again before every sync, so mail that failed
+    after its UID was passed is fetched again on the next poll or IDLE wake-up.
+    """
+    delay = 1
+    while True:
+        try:
+            with session() as mail:
+                reselect = True
+                while True:
+                    retry = retry_uids() if callable(retry_uids) else retry_uids
+                    yield from sync_folder(mail, folder, key, since_days, batch_size, state_path, fetch_mode,
+                                           reselect, retry)
+                    # Only a completed sync resets the backoff; a server that keeps refusing stays slowed down
+                    delay = 1
+                    reselect = False
+                    if not callable(retry_uids):
+                        retry_uids = ()
+                    if "IDLE" in mail.capabilities:
+                        mail.response("EXISTS")  # discard counts already covered by the sync
+                        while not idle_wait(mail, idle_timeout):
+                            # Keepalive before re-IDLE; mail arriving in between shows up as EXISTS
+                            mail.noop()
+                            if mail.response("EXISTS")[1][-1] is not None:
+                                break
+                    else:
+                        time.sleep(poll_interval)
+        except (imaplib.IMAP4.abort, OSError) as e:
+            print(f"IMAP connection lost ({e}); reconnecting in {delay}s...")
+        except Exception as e:
+            # NO/BAD replies, failed SELECT or UID SEARCH, refused IDLE: retry on a fresh session
+            print(f"IMAP error on {folder} ({e}); reconnecting in {delay}s...")
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+
+def watch_new_emails(host, port, username, password, folder=None, since_days=SINCE_DAYS,
+                     batch_size=FETCH_BATCH_SIZE, state_path=STATE_FILE, fetch_mode=FETCH_MODE,
+                     idle_timeout=IDLE_TIMEOUT, poll_interval=POLL_INTERVAL, connect=_connect):
+    """Yield new emails forever over one long-lived, automatically reconnected session."""
+    folder = folder or DEFAULT_FOLDER
+    session = lambda: connect(host, port, username, password)
+    for _, raw in _watch_folder(session, folder, folder_key(host, username, folder), since_days, batch_size,
+                                state_path, fetch_mode, idle_timeout, poll_interval):
+        yield raw
+
+
+def fetch_all_unread_emails(host, port, username, password, folder=None, since_days=SINCE_DAYS,
+                            batch_size=FETCH_BATCH_SIZE, fetch_mode=FETCH_MODE):
+    """Fetch all unread emails from folder, optionally only from last `since_days` days."""
+    return list(iter_unread_emails(host, port, username, password, folder, since_days, batch_size, fetch_mode))
+
+
+def _merge(producers):
+    """Run each producer in its own thread and yield their items as one stream.
+
+    Each producer hands over one item at a time and only resumes once the
+    consumer asks for the next item, so generators such as sync_folder still
+    record a UID as processed only after the consumer has finished with it.
+    """
+    handoff = queue.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def run(index, producer):
+        taken = acks[index]
+        try:
+            for item in producer():
+                handoff.put((index, item))
+                while not taken.wait(0.5):
+                    if stop.is_set():
+                        return
+                taken.clear()
+                if stop.is_set():
+                    return
+        except Exception as e:
+            handoff.put((index, e))
+        finally:
+            handoff.put((index, done))
+
+    acks = [threading.Event() for _ in producers]
+    for index, producer in enumerate(producers):
+        threading.Thread(target=run, args=(index, producer), daemon=True).start()
+
+    remaining = len(producers)
+    try:
+        while remaining:
+            index, item = handoff.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+                acks[index].set()
+    finally:
+        stop.set()
+
+
+class EmailClient:
+    """Fetch several folders and accounts concurrently through bounded connection pools."""
+
+    def __init__(self, accounts=None, max_connections=MAX_CONNECTIONS, since_days=SINCE_DAYS,
+                 batch_size=FETCH_BATCH_SIZE, fetch_mode=FETCH_MODE, state_path=STATE_FILE, connect=_connect,
+                 journal=None):
+        if accounts is None:
+            accounts = [{
+                "host": os.environ.get("EMAIL_HOST"),
+                "port": int(os.environ.get("EMAIL_PORT", 993)),
+                "username": os.environ.get("EMAIL_USER"),
+                "password": os.environ.get("EMAIL_PASS"),
+                "folders": [f.strip() for f in DEFAULT_FOLDER.split(",") if f.strip()],
+            }]
+        self.accounts = accounts
+        self.max_connections = max_connections
+        self.since_days = since_days
+        self.batch_size = batch_size
+        self.fetch_mode = fetch_mode
+        self.state_path = state_path
+        self._connect = connect
+        # Progress journal (storage/progress.py) of an interrupted run: unfinished UIDs are fetched again
+        self.journal = journal
+        self.pools = {}
+        self.action_pools = {}
+
+    def connect(self):
+        """Create one pool per account and log in once to fail fast on bad credentials."""
+        for account in self.accounts:
+            key = (account["host"], account.get("port", 993), account["username"])
+            if key in self.pools:
+                continue
+            pool = ConnectionPool(self._connect, account["host"], account.get("port", 993), account["username"],
+                                  account["password"], self.max_connections)
+            with pool.connection():
+                pass
+            self.pools[key] = pool
+
+    def _folders(self):
+        """Yield (pool, account, folder) for every watched mailbox."""
+        if not self.pools:
+            self.connect()
+        for account in self.accounts:
+            pool = self.pools[(account["host"], account.get("port", 993), account["username"])]
+            for folder in account.get("folders") or [DEFAULT_FOLDER]:
+                yield pool, account, folder
+
+    def _record(self, account, folder, uid, raw):
+        source = folder_key(account["host"], account["username"], folder)
+        return {"account": account["username"], "folder": folder, "source": source, "uid": uid, "raw": raw}
+
+    def _retry_uids(self, key, failed_only=False):
+        return self.journal.unfinished(key, failed_only) if self.journal is not None else ()
+
+    def iter_unread(self):
+        """Yield new mail from every folder of every account as one merged stream.
+
+        Folders are synced concurrently; each sync borrows a pooled connection,
+        so at most `max_connections` folders per account are fetched at once.
+        """
+        def producer(pool, account, folder):
+            def run():
+                key = folder_key(account["host"], account["username"], folder)
+                with pool.connection() as mail:
+                    for uid, raw in sync_folder(mail, folder, key, self.since_days, self.batch_size,
+                                                self.state_path, self.fetch_mode, True, self._retry_uids(key)):
+                        yield self._record(account, folder, uid, raw)
+            return run
+
+        yield from _merge([producer(*target) for target in self._folders()])
+
+    def fetch_unread(self):
+        """Fetch new mail from every folder of every account."""
+        return list(self.iter_unread())
+
+    def watch(self, idle_timeout=IDLE_TIMEOUT, poll_interval=POLL_INTERVAL):
+        """Yield new mail from every folder forever, IDLE-ing on one pooled connection per folder."""
+        targets = list(self._folders())
+        for pool in self.pools.values():
+            folders = sum(1 for p, _, _ in targets if p is pool)
+            if folders > pool.max_connections:
+                raise Exception(f"Watching {folders} folders of {pool.username} needs {folders} connections; "
+                                f"max_connections is {pool.max_connections}")
+
+        def producer(pool, account, folder):
+            def run():
+                key = folder_key(account["host"], account["username"], folder)
+                # First sync: everything an interrupted run left unfinished; afterwards only mail
+                # that failed, since the rest may still be in flight in the pipeline
+                interrupted = [self._retry_uids(key)]
+                retry = lambda: interrupted.pop() if interrupted else self._retry_uids(key, failed_only=True)
+                for uid, raw in _watch_folder(pool.connection, folder, key, self.since_days, self.batch_size,
+                                              self.state_path, self.fetch_mode, idle_timeout, poll_interval,
+                                              retry):
+                    yield self._record(account, folder, uid, raw)
+            return run
+
+        yield from _merge([producer(*target) for target in targets])
+
+    def action_session(self, username):
+        """Return a context manager giving `username`'s connection for server-side actions.
+
+        Actions get their own single-connection pool, so they never wait behind
+        the connections watch() keeps in IDLE.
+        """
+        if username not in self.action_pools:
+            account = next(a for a in self.accounts if a["username"] == username)
+            self.action_pools[username] = ConnectionPool(self._connect, account["host"], account.get("port", 993),
+                                                         username, account["password"], 1)
+        return self.action_pools[username].connection()
+
+    def logout(self):
+        """Log out every pooled connection."""
+        for pool in list(self.pools.values()) + list(self.action_pools.values()):
+            pool.close()
+        self.pools = {}
+        self.action_pools = {}
@@ -0,0 +1,113 @@
+# imap/html_text.py
+"""
+Responsibilities:
+- Convert HTML email bodies to plain text without building a document tree
+- Stream the HTML through lxml's parser-target interface (start/end/data callbacks)
+- Skip <style>, <script>, <head> and hidden elements (hidden attribute, aria-hidden,
+  display:none / visibility:hidden / zero-size inline styles used for preheaders)
+- Put block elements on their own lines (paragraphs separated by a blank line) and
+  collapse whitespace
+- Stop parsing once a character budget is reached
+- No MIME handling here; callers pass decoded HTML text
+
+Usage Context for Qwen 3 Coder:
+- html_to_text(html: str, max_chars=HTML_TEXT_MAX_CHARS) -> str
+    max_chars=None converts the whole document; otherwise at most max_chars
+    characters are returned and the rest of the HTML is never parsed
+- Used by imap/parser.py for HTML-only mail
+- max_chars defaults to HTML_TEXT_MAX_CHARS environment variable or 20000
+"""
+
+import os
+import re
+
+from lxml import etree
+
+HTML_TEXT_MAX_CHARS = int(os.environ.get("HTML_TEXT_MAX_CHARS", 20000)) or None
+
+# HTML fed to the parser at a time; the budget is checked between chunks
+FEED_SIZE = 16 * 1024
+
+SKIP_TAGS = frozenset({"head", "style", "script", "noscript", "template", "title", "meta", "link", "svg", "object"})
+# Paragraph-level elements are separated by a blank line (condense.py splits footers on these)
+PARAGRAPH_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr",
+    "main", "ol", "p", "pre", "section", "table", "ul",
+})
+LINE_TAGS = frozenset({"br", "dd", "div", "dl", "dt", "form", "li", "nav", "td", "th", "tr"})
+
+_HIDDEN_STYLE = re.compile(
+    r"display\s*:\s*none|visibility\s*:\s*hidden|(?<![-\w])(?:max-)?height\s*:\s*0(?:px)?\s*(?:;|$|!)",
+    re.I,
+)
+_SPACES = re.compile(r"[ \t\r\f\v\u00a0\u200b\u200c\u200d\u2060\ufeff\u034f]+")
+_BREAKS = re.compile(r"\s*[\n\x00][\s\x00]*")
+_PARAGRAPH = "\x00"
+
+
+def _hidden(tag, attrib) -> bool:
+    if tag in SKIP_TAGS or "hidden" in attrib or attrib.get("aria-hidden") == "true":
+        return True
+    style = attrib.get("style")
+    return bool(style and _HIDDEN_STYLE.search(style))
+
+
+class _TextTarget:
+    """lxml parser target collecting visible text; no elements are created."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.hidden_depth = 0
+        self.stack = []
+
+    def start(self, tag, attrib):
+        hidden = self.hidden_depth > 0 or _hidden(tag, attrib)
+        self.stack.append(hidden)
+        if hidden:
+            self.hidden_depth += 1
+        else:
+            self._break(tag)
+
+    def _break(self, tag):
+        if tag in PARAGRAPH_TAGS:
+            self.parts.append(_PARAGRAPH)
+        elif tag in LINE_TAGS:
+            self.parts.append("\n")
+
+    def end(self, tag):
+        if self.stack and self.stack.pop():
+            self.hidden_depth -= 1
+        else:
+            self._break(tag)
+
+    def data(self, data):
+        if not self.hidden_depth:
+            self.parts.append(data)
+            self.size += len(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return "".join(self.parts)
+
+
+def _collapse(text: str) -> str:
+    text = _SPACES.sub(" ", text)
+    # A run of breaks becomes a blank line if any paragraph ended in it, else a single newline
+    text = _BREAKS.sub(lambda m: "\n\n" if _PARAGRAPH in m.group() else "\n", text)
+    return text.strip()
+
+
+def html_to_text(html: str, max_chars=HTML_TEXT_MAX_CHARS) -> str:
+    """Return the visible text of `html`, at most `max_chars` characters when given."""
+    target = _TextTarget()
+    parser = etree.HTMLParser(target=target, recover=True, no_network=True)
+    for start in range(0, len(html), FEED_SIZE):
+        parser.feed(html[start:start + FEED_SIZE])
+        # Raw text only shrinks when collapsed, so overshoot by a margin before stopping
+        if max_chars and target.size > 2 * max_chars:
+            break
+    text = _collapse(parser.close() if html else "")
+    return text[:max_chars] if max_chars else text
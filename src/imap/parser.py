@@ -2,64 +2,195 @@
 """
 Responsibilities:
 - Parse raw RFC822 email bytes into structured dictionary
-- Extract fields: subject, from, to, date, body (plain text)
-- Handle HTML to plain-text conversion using BeautifulSoup
+- Extract fields: subject, from, to, date, message_id, in_reply_to, references, body (plain text)
+- Handle HTML to plain-text conversion with the streaming extractor in imap/html_text.py
+  (no document tree; style/script/hidden elements skipped; capped at HTML_TEXT_MAX_CHARS)
 - Fail fast if parsing fails
+- Bound memory per message: raw bytes beyond MAX_MESSAGE_BYTES are ignored, each text part
+  is decoded only up to MAX_PART_BYTES, non-text parts are never decoded, and walking stops
+  once MAX_BODY_CHARS of body text have been collected
+- Parse large backlogs in parallel on a process pool, results in input order
 - No domain logic or classification here
 
 Usage Context for Qwen 3 Coder:
-- parse_rfc822(raw_bytes) -> dict
+- parse_rfc822(raw_bytes, max_message_bytes=MAX_MESSAGE_BYTES, max_part_bytes=MAX_PART_BYTES,
+               max_body_chars=MAX_BODY_CHARS) -> dict
+    Caps default to PARSE_MAX_MESSAGE_BYTES (2 MiB), PARSE_MAX_PART_BYTES (256 KiB) and
+    PARSE_MAX_BODY_CHARS (20000); None (or 0 in the environment) disables a cap
     Returns a dictionary with at least the following keys:
         - 'subject': str
         - 'from': str
         - 'to': str
         - 'date': str
+        - 'message_id': str ('' when the header is missing)
+        - 'in_reply_to': str (parent Message-ID, '' when the header is missing)
+        - 'references': list[str] (Message-IDs of the thread, oldest first)
         - 'body': str (plain text)
+- parse_many(raw_messages, workers=PARSE_PROCESSES, chunk_size=PARSE_CHUNK_SIZE) -> Iterator[dict]
+    Yields parse_rfc822 results in input order. Raw bytes are sent to worker processes in
+    chunks (each payload is pickled exactly once; only the small parsed dicts come back),
+    with at most 2 * workers chunks in flight, so `raw_messages` is consumed lazily.
+    A message that fails to parse raises, unless return_exceptions=True, in which case the
+    exception is yielded in its place. workers <= 1 parses in-process
 - Only called from main.py or pipeline orchestration
 - All domain-specific decisions (classification, storage) happen outside this module
 - Safe to enhance parsing (e.g., attachments, HTML fallback) but must maintain the returned dict structure
 """
 
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from email import message_from_bytes
 from email.utils import parsedate_to_datetime
-from bs4 import BeautifulSoup
+
+from .html_text import html_to_text
 # import re
 # re.sub(r"\s+", " ", body.strip())
 
-def parse_rfc822(raw_bytes: bytes) -> dict:
+MAX_MESSAGE_BYTES = int(os.environ.get("PARSE_MAX_MESSAGE_BYTES", 2 * 1024 * 1024)) or None
+MAX_PART_BYTES = int(os.environ.get("PARSE_MAX_PART_BYTES", 256 * 1024)) or None
+MAX_BODY_CHARS = int(os.environ.get("PARSE_MAX_BODY_CHARS", 20000)) or None
+
+PARSE_PROCESSES = int(os.environ.get("PARSE_PROCESSES", os.cpu_count() or 1))
+# Messages per task: large enough to amortise inter-process overhead, small enough to keep cores busy
+PARSE_CHUNK_SIZE = int(os.environ.get("PARSE_CHUNK_SIZE", 64))
+
+_MESSAGE_ID = re.compile(r"<[^<>\s]+>")
+
+def _message_ids(value):
+    """Return the <...> Message-IDs in a header value, in order."""
+    return _MESSAGE_ID.findall(str(value or ""))
+
+def _decode_text(part, max_bytes):
+    """Decode a text part, decoding at most about `max_bytes` bytes of its payload."""
+    payload = part.get_payload()
+    if not isinstance(payload, str):
+        return ""
+    if max_bytes:
+        encoding = str(part.get("Content-Transfer-Encoding", "")).strip().lower()
+        # Cut the encoded payload so the decoded result stays just above `max_bytes`;
+        # 7bit/8bit payloads are already raw text and are simply sliced after decoding
+        limit = None
+        if encoding == "base64":
+            limit = max_bytes * 4 // 3 * 78 // 76 + 8
+        elif encoding == "quoted-printable":
+            limit = max_bytes * 3
+        if limit and len(payload) > limit:
+            part.set_payload(payload[:limit])
+    data = part.get_payload(decode=True) or b""
+    return data[:max_bytes].decode(errors="ignore") if max_bytes else data.decode(errors="ignore")
+
+def parse_rfc822(raw_bytes: bytes, max_message_bytes=MAX_MESSAGE_BYTES, max_part_bytes=MAX_PART_BYTES,
+                 max_body_chars=MAX_BODY_CHARS) -> dict:
     """Parse raw RFC822 email bytes and return structured dict with plain-text body."""
+    if max_message_bytes and len(raw_bytes) > max_message_bytes:
+        # Headers and the text part come first; an oversized tail is almost always attachments
+        raw_bytes = raw_bytes[:max_message_bytes]
     msg = message_from_bytes(raw_bytes)
     subject = msg.get("subject", "")
     from_ = msg.get("from", "")
     to = msg.get("to", "")
     date = msg.get("date", "")
+    message_id = str(msg.get("message-id", "")).strip()
+    # Thread headers; only the Message-IDs are kept, comments and folding are dropped
+    in_reply_to = (_message_ids(msg.get("in-reply-to")) or [""])[0]
+    references = _message_ids(msg.get("references"))
     dateTime = parsedate_to_datetime(date).astimezone()
 
     # Extract body (prefer plain text, fallback to HTML)
     body = ""
     if msg.is_multipart():
         for part in msg.walk():
+            if max_body_chars and len(body) >= max_body_chars:
+                break  # Enough text for classification; skip the remaining parts
             content_type = part.get_content_type()
             content_disposition = str(part.get("Content-Disposition"))
+            # Only text parts are ever decoded; attachments and images are skipped as-is
             if content_type == "text/plain" and "attachment" not in content_disposition:
-                body += part.get_payload(decode=True).decode(errors="ignore")
+                budget = max_part_bytes
+                if max_body_chars:
+                    # UTF-8 uses at most 4 bytes per character
+                    budget = min(budget or max_body_chars * 4, (max_body_chars - len(body)) * 4)
+                body += _decode_text(part, budget)
             elif content_type == "text/html" and not body:
-                html = part.get_payload(decode=True).decode(errors="ignore")
-                body += BeautifulSoup(html, "lxml").get_text()
+                html = _decode_text(part, max_part_bytes)
+                body += html_to_text(html, max_body_chars)
     else:
         content_type = msg.get_content_type()
-        payload = msg.get_payload(decode=True)
-        if payload:
-            if content_type == "text/plain":
-                body = payload.decode(errors="ignore")
-            elif content_type == "text/html":
-                body = BeautifulSoup(payload.decode(errors="ignore"), "lxml").get_text()
+        if content_type == "text/plain":
+            body = _decode_text(msg, max_part_bytes)
+        elif content_type == "text/html":
+            body = html_to_text(_decode_text(msg, max_part_bytes), max_body_chars)
+    if max_body_chars:
+        body = body[:max_body_chars]
 
     return {
         "subject": subject,
         "from": from_,
         "to": to,
         "date": dateTime.strftime("%Y-%m-%d %H:%M"), # dateTime.isoformat()
+        "message_id": message_id,
+        "in_reply_to": in_reply_to,
+        "references": references,
         "body": body.strip()
     }
+
+def _parse_chunk(raw_messages):
+    """Parse one chunk in a worker process; failures are returned, not raised."""
+    results = []
+    for raw in raw_messages:
+        try:
+            results.append(parse_rfc822(raw))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def _chunks(raw_messages, chunk_size):
+    chunk = []
+    for raw in raw_messages:
+        chunk.append(raw)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def parse_many(raw_messages, workers=PARSE_PROCESSES, chunk_size=PARSE_CHUNK_SIZE, return_exceptions=False):
+    """Parse many raw messages on a process pool, yielding results in input order."""
+    chunk_size = max(1, chunk_size)
+    if workers <= 1:
+        results = (_parse_chunk(chunk) for chunk in _chunks(raw_messages, chunk_size))
+        yield from _unchunk(results, return_exceptions)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = _chunks(raw_messages, chunk_size)
+        pending = deque()
+
+        def submit_next():
+            for chunk in chunks:
+                pending.append(executor.submit(_parse_chunk, chunk))
+                return True
+            return False
+
+        # Two chunks per worker: one parsing, one queued behind it
+        for _ in range(2 * workers):
+            if not submit_next():
+                break
+
+        def results():
+            while pending:
+                chunk = pending.popleft().result()
+                submit_next()
+                yield chunk
+
+        yield from _unchunk(results(), return_exceptions)
+
+def _unchunk(chunk_results, return_exceptions):
+    for chunk in chunk_results:
+        for result in chunk:
+            if isinstance(result, Exception) and not return_exceptions:
+                raise result
+            yield result
@@ -0,0 +1,79 @@
+# imap/pool.py
+"""
+Responsibilities:
+- Keep a bounded pool of authenticated IMAP connections to one account
+- Reuse idle connections (checked with NOOP) instead of logging in again
+- Never open more than `max_connections` at once; callers block until one is free
+- Discard connections that fail with a network error
+- No fetching, parsing or folder logic here
+
+Usage Context for Qwen 3 Coder:
+- pool = ConnectionPool(connect, host, port, username, password, max_connections=4)
+    `connect(host, port, username, password)` must return a logged-in imaplib connection
+- with pool.connection() as mail: ...
+- pool.close() logs out every idle connection
+- Gmail allows 15 simultaneous IMAP connections per account; stay well below it
+"""
+
+import imaplib
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """Bounded pool of logged-in IMAP connections for one account."""
+
+    def __init__(self, connect, host, port, username, password, max_connections=4):
+        self._connect = connect
+        self.host = host
+        self.port = port
+        self.username = username
+        self._password = password
+        self.max_connections = max_connections
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                mail = self._idle.pop() if self._idle else None
+            if mail is None:
+                return self._connect(self.host, self.port, self.username, self._password)
+            try:
+                mail.noop()
+                return mail
+            except (imaplib.IMAP4.error, OSError):
+                self._discard(mail)
+
+    def _discard(self, mail):
+        try:
+            mail.logout()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Borrow a logged-in connection, blocking while all slots are in use."""
+        self._slots.acquire()
+        mail = None
+        try:
+            mail = self._checkout()
+            yield mail
+        except (imaplib.IMAP4.abort, OSError):
+            if mail is not None:
+                self._discard(mail)
+                mail = None
+            raise
+        finally:
+            if mail is not None:
+                with self._lock:
+                    self._idle.append(mail)
+            self._slots.release()
+
+    def close(self):
+        """Log out every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for mail in idle:
+            self._discard(mail)
@@ -0,0 +1,63 @@
+# imap/sync_state.py
+"""
+Responsibilities:
+- Persist per-folder IMAP sync position between polls
+- Track UIDVALIDITY and the highest processed UID for each account/folder
+- Write atomically so a crash never leaves a half-written state file
+- No IMAP access or parsing here
+
+Usage Context for Qwen 3 Coder:
+- folder_key(host, username, folder) -> str
+- load_state(path=STATE_FILE) -> dict
+    Returns {folder_key: {"uidvalidity": int, "last_uid": int}}; empty if the file is missing
+- save_state(state, path=STATE_FILE) -> None
+- save_entry(key, entry, path=STATE_FILE) -> None
+    Updates a single folder under a lock, so concurrent folder syncs never
+    overwrite each other's progress
+- path defaults to EMAIL_SYNC_STATE environment variable or "data/state/imap_sync.json"
+"""
+
+import json
+import os
+import threading
+
+STATE_FILE = os.environ.get("EMAIL_SYNC_STATE", "data/state/imap_sync.json")
+
+_lock = threading.Lock()
+
+
+def folder_key(host, username, folder) -> str:
+    """Return the state key identifying one folder of one account."""
+    return f"{username}@{host}/{folder}"
+
+
+def load_state(path=STATE_FILE) -> dict:
+    """Load the sync state, returning an empty dict if none has been saved yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+
+def save_state(state: dict, path=STATE_FILE) -> None:
+    """Write the sync state atomically (temp file + rename)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_entry(key: str, entry: dict, path=STATE_FILE) -> None:
+    """Update one folder's sync position, preserving entries written by other folders."""
+    with _lock:
+        state = load_state(path)
+        state[key] = dict(entry)
+        save_state(state, path)
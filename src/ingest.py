@@ -0,0 +1,152 @@
+# ingest.py
+"""
+Responsibilities:
+- Offline bulk ingest: stream archived mail into the classification pipeline without
+  touching the mail server
+- Read .eml directory trees, mbox files and Maildir (including Maildir++ subfolders)
+- Scan mbox files through a memory map, splitting on "From " separator lines, so
+  multi-gigabyte archives are never read into memory at once
+- Produce the same records as EmailClient, so pipeline.run_pipeline handles both
+- No parsing or classification here
+
+Usage Context for Qwen 3 Coder:
+- iter_eml_tree(root) / iter_mbox(path) / iter_maildir(root) -> Iterator[dict]
+- iter_archive(path) -> Iterator[dict], picks the reader from what `path` looks like
+    Records are {"account": "offline", "folder": str, "source": str, "uid": None, "raw": bytes}
+    ("folder" is the directory, mbox file or Maildir folder the message came from)
+- CLI: python src/ingest.py PATH [PATH ...] [--parse-processes N] [--classify-workers N]
+    Runs the pipeline with the progress journal, so an interrupted backfill resumes and
+    mail that was already classified is skipped; parsing runs on a process pool
+"""
+
+import argparse
+import mmap
+import os
+import re
+import sys
+import time
+
+import metrics
+from imap.parser import PARSE_PROCESSES
+from pipeline import CLASSIFY_WORKERS, PARSE_WORKERS, QUEUE_SIZE, run_pipeline
+from storage.progress import ProgressJournal
+from storage.threads import ThreadIndex
+
+# mboxrd escapes body lines starting with "From " as ">From ", ">>From ", ...
+_MBOX_ESCAPED = re.compile(rb"^>(>*From )", re.M)
+
+def _record(folder, source, raw):
+    return {"account": "offline", "folder": folder, "source": source, "uid": None, "raw": raw}
+
+def iter_eml_tree(root):
+    """Yield every *.eml file below `root`, in sorted path order."""
+    for directory, subdirs, files in os.walk(root):
+        subdirs.sort()
+        folder = os.path.relpath(directory, root)
+        for name in sorted(files):
+            if name.lower().endswith(".eml"):
+                path = os.path.join(directory, name)
+                with open(path, "rb") as f:
+                    yield _record(folder, path, f.read())
+
+def iter_mbox(path):
+    """Yield the messages of an mbox file, scanning it through a memory map."""
+    folder = os.path.basename(path)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:5] != b"From ":
+                raise Exception(f"Not an mbox file: {path}")
+            start = 0
+            while start < len(data):
+                end = data.find(b"\nFrom ", start)
+                end = len(data) if end == -1 else end + 1
+                # Drop the "From sender date" envelope line; headers start on the next line
+                body = data.find(b"\n", start, end)
+                raw = data[body + 1:end] if body != -1 else b""
+                if raw.strip():
+                    yield _record(folder, f"{path}#{start}", _MBOX_ESCAPED.sub(rb"\1", raw))
+                start = end
+
+def _is_maildir(path):
+    return all(os.path.isdir(os.path.join(path, sub)) for sub in ("cur", "new"))
+
+def iter_maildir(root):
+    """Yield the messages of a Maildir and its Maildir++ subfolders (".Folder")."""
+    folders = [(os.path.basename(os.path.normpath(root)), root)]
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if name.startswith(".") and _is_maildir(path):
+            folders.append((name[1:], path))
+    for folder, path in folders:
+        for sub in ("cur", "new"):
+            directory = os.path.join(path, sub)
+            for name in sorted(os.listdir(directory)):
+                if name.startswith("."):
+                    continue
+                file_path = os.path.join(directory, name)
+                with open(file_path, "rb") as f:
+                    yield _record(folder, file_path, f.read())
+
+def iter_archive(path):
+    """Yield messages from a Maildir, an .eml tree, an mbox file or a single .eml file."""
+    if os.path.isdir(path):
+        yield from (iter_maildir(path) if _is_maildir(path) else iter_eml_tree(path))
+        return
+    with open(path, "rb") as f:
+        is_mbox = f.read(5) == b"From "
+    if is_mbox:
+        yield from iter_mbox(path)
+    else:
+        with open(path, "rb") as f:
+            yield _record(os.path.dirname(path), path, f.read())
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify archived mail (.eml trees, mbox, Maildir) offline.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="parse threads, used only with --parse-processes 1")
+    parser.add_argument("--parse-processes", type=int, default=PARSE_PROCESSES,
+                        help="parse on a process pool (default: one per CPU)")
+    parser.add_argument("--classify-workers", type=int, default=CLASSIFY_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--no-threads", action="store_true",
+                        help="classify every message on its own instead of against its thread")
+    args = parser.parse_args()
+
+    def records():
+        for path in args.paths:
+            yield from iter_archive(path)
+
+    metrics.start()
+    journal = ProgressJournal()
+    threads = None if args.no_threads else ThreadIndex()
+    counts = {"stored": 0, "failed": 0}
+    start = time.perf_counter()
+    try:
+        for record in run_pipeline(records(), args.parse_workers, args.classify_workers, args.queue_size,
+                                   journal=journal, threads=threads, parse_processes=args.parse_processes):
+            if "error" in record:
+                counts["failed"] += 1
+                print(f"{record['source']}: {record['error']}")
+            else:
+                counts["stored"] += 1
+            done = counts["stored"] + counts["failed"]
+            if done % 100 == 0:
+                print(f"{done} emails, {done / (time.perf_counter() - start):.1f}/s")
+    except KeyboardInterrupt:
+        print("Interrupted; run again to resume.")
+    finally:
+        journal.close()
+        if threads is not None:
+            threads.close()
+    elapsed = time.perf_counter() - start
+    print(f"Stored {counts['stored']}, failed {counts['failed']} in {elapsed:.1f}s "
+          f"(already stored mail is skipped)")
+
+if __name__ == "__main__":
+    # Fix Windows terminal encoding for Unicode subjects
+    if sys.platform == "win32":
+        sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -0,0 +1,111 @@
+# llm/cache.py
+"""
+Responsibilities:
+- Persist LLM classification results on disk, keyed by content hash
+- Key on the normalised (condensed) email body, model name and prompt version,
+  so a change to either the model or the prompt never serves stale results
+- Bound the cache by total size with least-recently-used eviction
+- Count hits and misses
+- No HTTP calls or prompt building here
+
+Usage Context for Qwen 3 Coder:
+- make_key(email_body, model, prompt_version) -> str
+- cache = ClassificationCache(path=CACHE_FILE, max_bytes=CACHE_MAX_BYTES)
+    cache.get(key) -> dict | None
+    cache.put(key, result: dict) -> None
+    cache.stats() -> {"hits", "misses", "entries", "bytes"}
+- path defaults to CLASSIFY_CACHE_FILE environment variable or "data/cache/classifications.sqlite3"
+- max_bytes defaults to CLASSIFY_CACHE_MAX_BYTES environment variable or 64 MiB
+- Safe to share between threads
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_FILE = os.environ.get("CLASSIFY_CACHE_FILE", "data/cache/classifications.sqlite3")
+CACHE_MAX_BYTES = int(os.environ.get("CLASSIFY_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise_body(email_body: str) -> str:
+    """Collapse whitespace and case so trivially different copies share a key."""
+    return _WHITESPACE.sub(" ", email_body).strip().casefold()
+
+
+def make_key(email_body: str, model: str, prompt_version: str) -> str:
+    """Return the content hash identifying one (body, model, prompt) classification."""
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, normalise_body(email_body)):
+        digest.update(part.encode("utf-8", errors="ignore"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ClassificationCache:
+    """Size-bounded, LRU-evicted SQLite cache of classification results."""
+
+    def __init__(self, path=CACHE_FILE, max_bytes=CACHE_MAX_BYTES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS classifications ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON classifications (last_used)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM classifications").fetchone()[0]
+
+    def get(self, key: str) -> dict | None:
+        """Return the cached result for `key`, or None, refreshing its LRU position."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM classifications WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE classifications SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return json.loads(row[0])
+
+    def put(self, key: str, result: dict) -> None:
+        """Store `result` under `key`, evicting least-recently-used entries beyond max_bytes."""
+        value = json.dumps(result)
+        size = len(key) + len(value)
+        with self._lock:
+            old = self._db.execute("SELECT size FROM classifications WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO classifications (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            while self._bytes > self.max_bytes:
+                victim = self._db.execute(
+                    "SELECT key, size FROM classifications ORDER BY last_used LIMIT 1"
+                ).fetchone()
+                if victim is None:
+                    break
+                self._db.execute("DELETE FROM classifications WHERE key = ?", (victim[0],))
+                self._bytes -= victim[1]
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": self._bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
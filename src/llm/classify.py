@@ -1,17 +1,174 @@
+import hashlib
 import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import ClassificationCache, make_key
+from .condense import TOKEN_BUDGET, condense_body
+from .knn import knn_classify, remember
+from .near_dup import near_dup_classify, remember_template
+from .prompts import (CATEGORIES, get_batch_classification_prompt, get_classification_prompt,
+                      get_extraction_prompt, get_thread_classification_prompt)
+from .rules import match_rules
 
-OLLAMA_URL = "http://design:11434/api/generate"
+OLLAMA_URL = os.environ.get("OLLAMA_API_BASE", "http://design:11434") + "/api/generate"
 MODEL_NAME = "qwen3-coder:latest"
 
-def classify_email(email_body):
-    prompt = f"""
-    Classify the email into: [Job, News, Financial, Personal, Social, Spam].
-    Respond with a JSON object only.
-    
-    Email Body: {email_body[:2000]}
-    """
-    
+# Requests kept in flight by classify_emails; match OLLAMA_NUM_PARALLEL on the server
+CONCURRENCY = int(os.environ.get("OLLAMA_CONCURRENCY", 4))
+
+# Emails packed into one prompt by classify_emails_batched
+BATCH_SIZE = int(os.environ.get("CLASSIFY_BATCH_SIZE", 8))
+
+# Set CLASSIFY_CACHE=0 to always call the LLM
+CACHE_ENABLED = os.environ.get("CLASSIFY_CACHE", "1") != "0"
+# Set CLASSIFY_RULES=0 to send obvious emails to the LLM as well
+RULES_ENABLED = os.environ.get("CLASSIFY_RULES", "1") != "0"
+# Set CLASSIFY_KNN=1 to answer from labelled neighbours (llm/knn.py) before calling the LLM
+KNN_ENABLED = os.environ.get("CLASSIFY_KNN", "0") == "1"
+# Set CLASSIFY_NEAR_DUP=0 to stop reusing categories of near-identical template mail (llm/near_dup.py)
+NEAR_DUP_ENABLED = os.environ.get("CLASSIFY_NEAR_DUP", "1") != "0"
+# Replies whose own text (quotes and signature stripped) is shorter than this keep the
+# thread's state without an LLM call; 0 always asks the LLM
+THREAD_INHERIT_CHARS = int(os.environ.get("CLASSIFY_THREAD_INHERIT_CHARS", 80))
+
+_session = None
+_lock = threading.Lock()
+_cache = None
+_generate_hooks = []
+
+def _get_session():
+    """Return the shared keep-alive session; idle connections are kept for reuse."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(CONCURRENCY, 16))
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def add_generate_hook(hook):
+    """Call hook(seconds, prompt_eval_count, eval_count) after every Ollama request."""
+    _generate_hooks.append(hook)
+
+def get_cache():
+    """Return the shared on-disk classification cache."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = ClassificationCache()
+        return _cache
+
+def _build_prompt(email_text):
+    # Same taxonomy as the rule stage, so both paths produce comparable results
+    return get_classification_prompt(email_text)
+
+# Changes whenever the prompt template does, so stale cache entries are never served
+PROMPT_VERSION = hashlib.sha256(_build_prompt("").encode()).hexdigest()[:16]
+
+THREAD_PROMPT_VERSION = hashlib.sha256(get_thread_classification_prompt("", {}).encode()).hexdigest()[:16]
+
+def inherit_thread_state(thread_state, reason):
+    """Return the thread's latest classification as the result for a message that does not change it."""
+    result = dict(thread_state)
+    result["rationale"] = reason
+    result["inherited"] = True
+    return result
+
+def _complete_fields(email_text, result):
+    """Extract the fields a near-duplicate could not carry over; its category is kept either way."""
+    missing = result.pop("missing_fields", None)
+    if not missing:
+        return result
+    try:
+        fields = json.loads(_generate(get_extraction_prompt(email_text, result["category"])))
+        for field in missing:
+            result[field] = fields.get(field)
+    except Exception:
+        pass  # The fields stay null
+    return result
+
+def classify_email(email_body, use_cache=CACHE_ENABLED, subject="", use_rules=RULES_ENABLED,
+                   token_budget=TOKEN_BUDGET, use_knn=KNN_ENABLED, thread_state=None,
+                   use_near_dup=NEAR_DUP_ENABLED):
+    """Classify one email; with `thread_state` (the thread's latest result) only the new text is judged."""
+    # Quoted history, signatures, footers and long URLs only cost LLM time; the rules also
+    # run on the condensed text, so a phrase in quoted history never decides a reply
+    email_text = condense_body(email_body, token_budget)
+
+    if use_rules:
+        # A reply's subject repeats the thread's first message; only its own new text may decide
+        result = match_rules("" if thread_state is not None else subject, email_text)
+        if result is not None:
+            if thread_state is not None:
+                # Rules never extract fields; the thread already knows them
+                for field in ("employer_or_recruiter", "job_title"):
+                    result[field] = result.get(field) or thread_state.get(field)
+            return result
+
+    prompt_version = PROMPT_VERSION
+    if thread_state is not None:
+        if len(email_text) < THREAD_INHERIT_CHARS:
+            return inherit_thread_state(thread_state, "Short reply in an already classified thread")
+        # The same reply means something different against a different thread state
+        state = json.dumps([thread_state.get(f) for f in ("category", "employer_or_recruiter", "job_title")])
+        prompt_version = f"{THREAD_PROMPT_VERSION}:{state}"
+        # Neighbours and templates are whole emails; a reply is judged against its thread instead
+        use_knn = use_near_dup = False
+
+    key = None
+    if use_cache:
+        key = make_key(email_text, MODEL_NAME, prompt_version)
+        cached = get_cache().get(key)
+        # Entries cached before replies were validated may hold a category outside the taxonomy
+        if cached is not None and cached.get("category") in CATEGORIES:
+            return cached
+
+    signature = None
+    if use_near_dup:
+        # Template mail (ATS acknowledgements, rejections): the category of an earlier copy is reused
+        result, signature = near_dup_classify(email_text)
+        if result is not None:
+            result = _complete_fields(email_text, result)
+            if key is not None:
+                # The extraction call made for missing fields is not repeated on a refetch
+                get_cache().put(key, result)
+            return result
+
+    vector = None
+    if use_knn:
+        # Embedding takes milliseconds; the LLM is only called when neighbours disagree
+        result, vector = knn_classify(email_text)
+        if result is not None:
+            return result
+
+    try:
+        if thread_state is not None:
+            prompt = get_thread_classification_prompt(email_text, thread_state)
+        else:
+            prompt = _build_prompt(email_text)
+        result = json.loads(_generate(prompt))
+        if not isinstance(result, dict) or result.get("category") not in CATEGORIES:
+            # Same check as batch replies: a misspelled category must never reach the cache
+            category = result.get("category") if isinstance(result, dict) else result
+            raise Exception(f"Unknown category in reply: {category!r}")
+        if key is not None:
+            get_cache().put(key, result)
+        remember(vector, result.get("category"))
+        remember_template(signature, result)
+        return result
+    except Exception as e:
+        return {"category": "Error", "reason": str(e)}
+
+def _generate(prompt):
+    """Send one prompt to Ollama in JSON mode and return the raw reply text."""
     payload = {
         "model": MODEL_NAME,
         "prompt": prompt,
@@ -20,15 +177,160 @@ def classify_email(email_body):
         "options": { "temperature": 0 }
     }
 
-    try:
-        # Increase timeout to 90s; complex emails can take time on local hardware
-        response = requests.post(OLLAMA_URL, json=payload, timeout=90)
-        response.raise_for_status()
-        
-        reply = response.json().get("response", "").strip()
-        if not reply:
-            raise ValueError("Empty response")
-            
-        return json.loads(reply)
-    except Exception as e:
-        return {"category": "Error", "reason": str(e)}
+    # Increase timeout to 90s; complex emails can take time on local hardware
+    start = time.perf_counter()
+    response = _get_session().post(OLLAMA_URL, json=payload, timeout=90)
+    response.raise_for_status()
+
+    data = response.json()
+    for hook in _generate_hooks:
+        hook(time.perf_counter() - start, data.get("prompt_eval_count"), data.get("eval_count"))
+    reply = data.get("response", "").strip()
+    if not reply:
+        raise ValueError("Empty response")
+    return reply
+
+def _in_flight(fn, items, max_workers, ordered):
+    """Yield (index, fn(item)) with up to `max_workers` calls running at once.
+
+    Results come in input order when `ordered` is True, otherwise as soon as
+    each call completes. `items` is consumed lazily.
+    """
+    max_workers = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        items = enumerate(items)
+        pending = deque()
+
+        def submit_next():
+            for index, item in items:
+                pending.append((index, executor.submit(fn, item)))
+                return True
+            return False
+
+        # Queue a second window so workers never idle behind a slow head-of-line request
+        for _ in range(2 * max_workers):
+            if not submit_next():
+                break
+
+        while pending:
+            if ordered:
+                index, future = pending.popleft()
+                result = future.result()
+                submit_next()
+                yield index, result
+                continue
+
+            done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+            for item in [p for p in pending if p[1] in done]:
+                pending.remove(item)
+                submit_next()
+                yield item[0], item[1].result()
+
+def classify_emails(email_bodies, max_workers=CONCURRENCY, ordered=True, use_cache=CACHE_ENABLED,
+                    use_rules=RULES_ENABLED, use_knn=KNN_ENABLED, use_near_dup=NEAR_DUP_ENABLED):
+    """Classify many emails with up to `max_workers` requests in flight.
+
+    Yields (index, result) pairs: in input order when `ordered` is True,
+    otherwise as soon as each classification completes. `email_bodies` is
+    consumed lazily, so large iterables are never fully materialised.
+    """
+    classify = lambda body: classify_email(body, use_cache, "", use_rules, use_knn=use_knn,
+                                           use_near_dup=use_near_dup)
+    yield from _in_flight(classify, email_bodies, max_workers, ordered)
+
+def _parse_batch_reply(reply, ids):
+    """Map email id -> result for every well-formed entry of a batch reply."""
+    data = json.loads(reply)
+    entries = data.get("results", []) if isinstance(data, dict) else data
+    entries = entries if isinstance(entries, list) else []
+    # Position identifies an entry only when there is exactly one per email; otherwise a dropped
+    # email would shift every later result onto the wrong one, so id-less entries are discarded
+    positional = len(entries) == len(ids)
+    results = {}
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict) or entry.get("category") not in CATEGORIES:
+            continue
+        email_id = entry.pop("id", None)
+        if email_id is None and positional:
+            email_id = ids[position]
+        email_id = "" if email_id is None else str(email_id)
+        if email_id in ids and email_id not in results:
+            results[email_id] = entry
+    return results
+
+def _classify_batch(email_bodies, use_cache=CACHE_ENABLED, use_rules=RULES_ENABLED, use_knn=KNN_ENABLED,
+                    use_near_dup=NEAR_DUP_ENABLED):
+    """Classify a list of emails with one LLM request, falling back per email."""
+    results = [None] * len(email_bodies)
+    keys = [None] * len(email_bodies)
+    texts = [None] * len(email_bodies)
+    vectors = [None] * len(email_bodies)
+    signatures = [None] * len(email_bodies)
+    todo = []
+    for i, body in enumerate(email_bodies):
+        texts[i] = condense_body(body)
+        if use_rules:
+            results[i] = match_rules("", texts[i])
+        if results[i] is None and use_cache:
+            keys[i] = make_key(texts[i], MODEL_NAME, PROMPT_VERSION)
+            results[i] = get_cache().get(keys[i])
+            if results[i] is not None and results[i].get("category") not in CATEGORIES:
+                results[i] = None
+        if results[i] is None and use_near_dup:
+            results[i], signatures[i] = near_dup_classify(texts[i])
+            if results[i] is not None:
+                results[i] = _complete_fields(texts[i], results[i])
+                if keys[i] is not None:
+                    get_cache().put(keys[i], results[i])
+        if results[i] is None and use_knn:
+            results[i], vectors[i] = knn_classify(texts[i])
+        if results[i] is None:
+            todo.append(i)
+
+    parsed = {}
+    if len(todo) > 1:
+        ids = [str(n) for n in range(1, len(todo) + 1)]
+        try:
+            prompt = get_batch_classification_prompt([(ids[n], texts[i]) for n, i in enumerate(todo)])
+            parsed = _parse_batch_reply(_generate(prompt), ids)
+        except Exception:
+            parsed = {}
+
+    for n, i in enumerate(todo):
+        result = parsed.get(str(n + 1))
+        if result is None:
+            # Missing or invalid entry: classify this email on its own
+            results[i] = classify_email(email_bodies[i], use_cache, "", False, use_knn=False, use_near_dup=False)
+            remember(vectors[i], results[i].get("category"))
+            remember_template(signatures[i], results[i])
+            continue
+        results[i] = result
+        remember(vectors[i], result.get("category"))
+        remember_template(signatures[i], result)
+        if keys[i] is not None:
+            get_cache().put(keys[i], result)
+    return results
+
+def classify_emails_batched(email_bodies, batch_size=BATCH_SIZE, max_workers=CONCURRENCY, ordered=True,
+                            use_cache=CACHE_ENABLED, use_rules=RULES_ENABLED, use_knn=KNN_ENABLED,
+                            use_near_dup=NEAR_DUP_ENABLED):
+    """Classify many emails, packing `batch_size` of them into each LLM request.
+
+    Yields (index, result) pairs like classify_emails. Entries the model
+    omits or returns malformed are re-classified with single-email calls.
+    """
+    def batches():
+        batch = []
+        for body in email_bodies:
+            batch.append(body)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    classify = lambda batch: _classify_batch(batch, use_cache, use_rules, use_knn, use_near_dup)
+    batch_size = max(1, batch_size)
+    for batch_index, results in _in_flight(classify, batches(), max_workers, ordered):
+        for offset, result in enumerate(results):
+            yield batch_index * batch_size + offset, result
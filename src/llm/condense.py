@@ -0,0 +1,130 @@
+# llm/condense.py
+"""
+Responsibilities:
+- Shrink a parsed plain-text email body before it is put into a prompt
+- Strip quoted reply history, signatures, legal/marketing footers and long URLs
+- Keep forwarded mail (it is the content); only its marker and header block are dropped.
+  Outlook forwards have no marker: a header block under a trivially short note ("Please see
+  below.") is treated as a forward rather than as quoted history
+- Collapse whitespace and fit the result to a token budget
+- Keep the text that decides the category (the newest message, top first)
+- No HTTP calls, prompt building or classification here
+
+Usage Context for Qwen 3 Coder:
+- condense_body(body: str, token_budget=TOKEN_BUDGET) -> str
+- estimate_tokens(text: str) -> int
+    Rough count (about 4 characters per token for English); no tokenizer needed
+- token_budget defaults to CONDENSE_TOKEN_BUDGET environment variable or 512
+- Called between imap/parser.py and the prompt builders in llm/prompts.py
+"""
+
+import os
+import re
+
+TOKEN_BUDGET = int(os.environ.get("CONDENSE_TOKEN_BUDGET", 512))
+CHARS_PER_TOKEN = 4
+
+# Everything from these lines onwards is earlier conversation
+_QUOTE_HEADERS = re.compile(
+    r"^(?:On .{5,200}wrote:\s*$"
+    r"|-{2,}\s*Original Message\s*-{2,}"
+    r"|_{10,}\s*$"
+    r"|From:\s.+\n(?:.*\n){0,3}?(?:Sent|Date):\s)",
+    re.IGNORECASE | re.MULTILINE,
+)
+# A forwarded mail is the content itself: only its marker and header block are dropped
+_FORWARD_HEADER = re.compile(
+    r"^(?:-{2,}\s*Forwarded message\s*-{2,}|Begin forwarded message:)[ \t]*\n"
+    r"(?:[ \t]*(?:From|Date|Sent|Subject|To|Cc|Reply-To):.*\n)*",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Outlook's separator and header block, stripped when the mail above it is only a short note
+_HEADER_BLOCK = re.compile(
+    r"(?:(?:_{10,}|-{2,}\s*Original Message\s*-{2,})[ \t]*\n)?"
+    r"(?:[ \t]*(?:From|Date|Sent|Subject|To|Cc|Reply-To):.*\n)*",
+    re.IGNORECASE,
+)
+_QUOTED_LINE = re.compile(r"^\s*>.*$\n?", re.MULTILINE)
+# RFC 3676 signature separator, plus mobile footers
+_SIGNATURE = re.compile(r"^(?:-- ?$|Sent from my \w+)", re.MULTILINE)
+_SIGN_OFF = re.compile(
+    r"^(?:kind|best|warm|many thanks(?: and)?|with)?\s*regards,?\s*$|^(?:thanks|thank you|cheers|best wishes),?\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_FOOTER_HINTS = re.compile(
+    r"unsubscribe|privacy policy|intended (?:solely )?for the (?:use of the )?(?:individual|addressee|recipient)"
+    r"|this (?:e-?mail|message) (?:and any attachments )?(?:is|may be) confidential"
+    r"|manage (?:your )?(?:email )?preferences|registered (?:office|in england)|view (?:this email )?in (?:your )?browser",
+    re.IGNORECASE,
+)
+_URL = re.compile(r"<?(https?://([^/\s>]+)[^\s>]*)>?")
+_SPACES = re.compile(r"[ \t\u00a0\u200b]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+LONG_URL = 40
+# Text above a header block shorter than this is a forwarding note, not a reply
+FORWARD_NOTE_CHARS = 60
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budget decisions."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _shorten_url(match):
+    url, host = match.group(1), match.group(2)
+    return url if len(url) <= LONG_URL else f"[link: {host}]"
+
+
+def _cut_at_sign_off(text):
+    # Only treat a sign-off as the start of the signature in the second half
+    for match in _SIGN_OFF.finditer(text):
+        if match.start() >= len(text) // 2:
+            return text[:match.start()]
+    return text
+
+
+def _fit(text, token_budget):
+    limit = token_budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    # Prefer ending on a sentence, else a word boundary
+    end = max(cut.rfind(". "), cut.rfind("\n"))
+    if end < limit // 2:
+        end = cut.rfind(" ")
+    return cut[:end + 1].rstrip() if end > 0 else cut
+
+
+def condense_body(body: str, token_budget=TOKEN_BUDGET) -> str:
+    """Return the decision-relevant part of `body`, fitted to `token_budget` tokens."""
+    if not body:
+        return ""
+    text = body.replace("\r\n", "\n").replace("\r", "\n")
+
+    text = _FORWARD_HEADER.sub("\n", text)
+    quote = _QUOTE_HEADERS.search(text)
+    while quote:
+        header = _HEADER_BLOCK.match(text, quote.start())
+        if header.end() > quote.start() and len(text[:quote.start()].strip()) < FORWARD_NOTE_CHARS:
+            # Forwarded without a marker: keep the mail, drop its headers, then look for its own quotes
+            text = text[:quote.start()] + "\n" + text[header.end():]
+            quote = _QUOTE_HEADERS.search(text, quote.start() + 1)
+            continue
+        if quote.start() > 0:
+            text = text[:quote.start()]
+        break
+    text = _QUOTED_LINE.sub("", text)
+
+    signature = _SIGNATURE.search(text)
+    if signature and signature.start() > 0:
+        text = text[:signature.start()]
+    text = _cut_at_sign_off(text)
+
+    text = _URL.sub(_shorten_url, text)
+    text = _SPACES.sub(" ", text)
+    paragraphs = [p.strip() for p in _BLANK_LINES.split(text)]
+    paragraphs = [p for p in paragraphs if p and not _FOOTER_HINTS.search(p)]
+    text = "\n\n".join("\n".join(line.strip() for line in p.splitlines() if line.strip()) for p in paragraphs)
+
+    return _fit(text, token_budget)
@@ -0,0 +1,239 @@
+# llm/knn.py
+"""
+Responsibilities:
+- Label emails by nearest-neighbour vote against already-labelled emails, before the LLM
+- Embed the condensed body with a local fastembed model (milliseconds, no LLM call)
+- Keep labelled embeddings in a NumPy matrix (L2-normalised rows, cosine = dot product),
+  persisted to one .npz file
+- Only answer when the neighbours agree; otherwise return None so the email goes to the LLM
+- Learn from LLM results, so the fast path covers more mail over time
+- No HTTP calls, parsing or storage here
+
+Usage Context for Qwen 3 Coder:
+- knn_classify(email_text) -> (dict | None, vector | None)
+    Returns the same structure as match_rules in llm/rules.py when at least KNN_K
+    neighbours with similarity >= KNN_MIN_SIMILARITY exist and a similarity-weighted
+    share >= KNN_AGREEMENT of them has one category; otherwise (None, vector).
+    The vector can be handed to remember() once the LLM has answered
+- remember(vector, category) -> None, add an LLM-labelled email to the shared index
+- index = KnnIndex(); index.add(vectors, categories); index.search(vector, k) -> [(category, similarity)]
+- KnnIndex.load(path, model) / index.save(path, model)
+- embed(texts) -> np.ndarray of L2-normalised rows
+- knn_stats() -> {"checked", "answered", "rate"}
+- Requires fastembed (environment.yaml); without it knn_classify always returns (None, None)
+- CLI: python -m src.llm.knn build [--db data/results/results.sqlite3]
+    Rebuilds the index from the labelled emails in the SQLite result store
+"""
+
+import argparse
+import atexit
+import os
+import threading
+
+import numpy as np
+
+from .condense import condense_body
+from .prompts import CATEGORIES
+
+EMBED_MODEL = os.environ.get("KNN_EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+INDEX_FILE = os.environ.get("KNN_INDEX_FILE", "data/cache/knn_index.npz")
+KNN_K = int(os.environ.get("KNN_K", 5))
+# Share of the (similarity-weighted) neighbour vote the winning category needs
+KNN_AGREEMENT = float(os.environ.get("KNN_AGREEMENT", 0.8))
+# Neighbours less similar than this do not vote
+KNN_MIN_SIMILARITY = float(os.environ.get("KNN_MIN_SIMILARITY", 0.85))
+# Learned embeddings are written to disk every this many additions (and at exit)
+SAVE_EVERY = int(os.environ.get("KNN_SAVE_EVERY", 100))
+
+_lock = threading.Lock()
+_embedder = None
+_index = None
+_unsaved = 0
+_stats = {"checked": 0, "answered": 0}
+
+
+class KnnIndex:
+    """Labelled embeddings in a growable float32 matrix; search is one matrix-vector product."""
+
+    def __init__(self, dim=None):
+        self.dim = dim
+        self._vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self.categories = []
+
+    def __len__(self):
+        return len(self.categories)
+
+    @property
+    def vectors(self):
+        return self._vectors[:len(self.categories)]
+
+    def add(self, vectors, categories) -> None:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        size = len(self.categories)
+        if size + len(vectors) > len(self._vectors):
+            # Double the capacity so repeated single additions stay amortised O(1)
+            grown = np.zeros((max(2 * len(self._vectors), size + len(vectors), 64), self.dim), dtype=np.float32)
+            grown[:size] = self.vectors
+            self._vectors = grown
+        self._vectors[size:size + len(vectors)] = vectors
+        self.categories.extend(categories)
+
+    def search(self, vector, k=KNN_K) -> list[tuple[str, float]]:
+        """Return up to `k` (category, cosine similarity) pairs, most similar first."""
+        if not self.categories:
+            return []
+        similarities = self.vectors @ np.asarray(vector, dtype=np.float32)
+        k = min(k, len(similarities))
+        nearest = np.argpartition(-similarities, k - 1)[:k]
+        nearest = nearest[np.argsort(-similarities[nearest])]
+        return [(self.categories[i], float(similarities[i])) for i in nearest]
+
+    def save(self, path=INDEX_FILE, model=EMBED_MODEL) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, vectors=self.vectors, categories=np.array(self.categories, dtype=str),
+                 model=np.array(model))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_FILE, model=EMBED_MODEL):
+        """Load the index, or return an empty one if it is missing or built with another model."""
+        index = cls()
+        if os.path.exists(path):
+            with np.load(path) as data:
+                if str(data["model"]) == model and len(data["categories"]):
+                    index.add(data["vectors"], [str(c) for c in data["categories"]])
+        return index
+
+
+def _get_embedder():
+    global _embedder
+    with _lock:
+        if _embedder is None:
+            try:
+                from fastembed import TextEmbedding
+            except ImportError:
+                print("fastembed is not installed; the kNN classifier is disabled")
+                _embedder = False
+            else:
+                _embedder = TextEmbedding(EMBED_MODEL)
+        return _embedder
+
+
+def embed(texts) -> np.ndarray:
+    """Embed `texts` with the local model and return L2-normalised float32 rows."""
+    embedder = _get_embedder()
+    if not embedder:
+        raise Exception("fastembed is not installed")
+    vectors = np.array(list(embedder.embed(list(texts))), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def get_index() -> KnnIndex:
+    """Return the shared index, loaded from INDEX_FILE on first use."""
+    global _index
+    with _lock:
+        if _index is None:
+            _index = KnnIndex.load(INDEX_FILE, EMBED_MODEL)
+            atexit.register(_save)
+        return _index
+
+
+def _save():
+    global _unsaved
+    with _lock:
+        if _index is not None and _unsaved:
+            _index.save(INDEX_FILE, EMBED_MODEL)
+            _unsaved = 0
+
+
+def vote(neighbours, k=KNN_K, agreement=KNN_AGREEMENT, min_similarity=KNN_MIN_SIMILARITY):
+    """Return (category, share) when enough close neighbours agree, else None."""
+    close = [(category, similarity) for category, similarity in neighbours if similarity >= min_similarity]
+    if len(close) < k:
+        return None
+    weights = {}
+    for category, similarity in close:
+        weights[category] = weights.get(category, 0.0) + similarity
+    category = max(weights, key=weights.get)
+    share = weights[category] / sum(weights.values())
+    return (category, share) if share >= agreement else None
+
+
+def knn_classify(email_text, k=KNN_K, agreement=KNN_AGREEMENT, min_similarity=KNN_MIN_SIMILARITY):
+    """Classify by neighbour vote; returns (result or None, embedding or None)."""
+    if not _get_embedder():
+        return None, None
+    vector = embed([email_text])[0]
+    index = get_index()
+    with _lock:
+        neighbours = index.search(vector, k)
+    winner = vote(neighbours, k, agreement, min_similarity)
+    with _lock:
+        _stats["checked"] += 1
+        _stats["answered"] += winner is not None
+    if winner is None:
+        return None, vector
+    category, share = winner
+    return {
+        "category": category,
+        "confidence": round(share, 2),
+        "rationale": f"{k} nearest labelled emails (similarity >= {min_similarity}) vote "
+                     f"{share:.0%} {category}",
+        "employer_or_recruiter": None,
+        "job_title": None,
+    }, vector
+
+
+def remember(vector, category) -> None:
+    """Add an LLM-labelled embedding to the shared index."""
+    global _unsaved
+    if vector is None or category not in CATEGORIES:
+        return
+    index = get_index()
+    with _lock:
+        index.add([vector], [category])
+        _unsaved += 1
+        save = _unsaved >= SAVE_EVERY
+    if save:
+        _save()
+
+
+def knn_stats() -> dict:
+    """Return how many emails were checked and how many the neighbours answered."""
+    with _lock:
+        checked, answered = _stats["checked"], _stats["answered"]
+    return {"checked": checked, "answered": answered, "rate": answered / checked if checked else 0.0}
+
+
+def main():
+    from ..storage.sqlite_store import DB_FILE, SqliteStore
+
+    parser = argparse.ArgumentParser(description="Build the kNN index from the SQLite result store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Embed every labelled email in the result store")
+    build.add_argument("--db", default=DB_FILE)
+    build.add_argument("--out", default=INDEX_FILE)
+    build.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    store = SqliteStore(args.db)
+    rows = [r for r in store.query() if r["classification"].get("category") in CATEGORIES]
+    store.close()
+    index = KnnIndex()
+    for start in range(0, len(rows), args.batch_size):
+        batch = rows[start:start + args.batch_size]
+        texts = [condense_body(r["email"].get("body", "")) for r in batch]
+        index.add(embed(texts), [r["classification"]["category"] for r in batch])
+    index.save(args.out)
+    print(f"Indexed {len(index)} labelled emails into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# llm/near_dup.py
+"""
+Responsibilities:
+- Recognise near-identical template mail (ATS acknowledgements and rejections with only the
+  candidate name and job title swapped) and reuse the category of the earlier email
+- MinHash signatures over word shingles of the condensed body, bucketed by LSH bands, so a
+  lookup only compares against a handful of candidates (sub-millisecond, no model, no LLM)
+- Only answer when every close match agrees on the category; otherwise return None so the
+  email goes to the LLM
+- Keep extracted fields only when they literally occur in the new email
+- Learn from LLM results; signatures persisted to one .npz file
+- No HTTP calls, parsing or storage here
+
+Usage Context for Qwen 3 Coder:
+- near_dup_classify(email_text, threshold=NEAR_DUP_THRESHOLD) -> (dict | None, signature | None)
+    Returns the matched email's result (same structure as the LLM result) when at least one
+    indexed email has estimated Jaccard similarity >= threshold and all such emails share one
+    category. 'employer_or_recruiter' / 'job_title' are kept only when the new email contains
+    them; a field that was set on the match but is missing here is listed in 'missing_fields'
+    for the caller to extract. The signature can be handed to remember_template() afterwards
+- remember_template(signature, result) -> None, add an LLM-labelled email to the shared index
+- signature(text) -> np.ndarray (uint32, NEAR_DUP_PERMUTATIONS values), None for very short text
+- index = MinHashIndex(); index.add(signatures, results); index.search(signature, threshold)
+- MinHashIndex.load(path) / index.save(path)
+- near_dup_stats() -> {"checked", "answered", "rate"}
+- Tuning: NEAR_DUP_THRESHOLD (similarity to reuse), NEAR_DUP_SHINGLE (words per shingle),
+  NEAR_DUP_PERMUTATIONS and NEAR_DUP_BANDS (LSH recall), NEAR_DUP_MIN_SHINGLES (shorter
+  texts are never matched); scripts/evaluate_near_dup.py reports precision per threshold
+- CLI: python -m src.llm.near_dup build [--db data/results/results.sqlite3]
+    Rebuilds the index from the labelled emails in the SQLite result store
+"""
+
+import argparse
+import atexit
+import json
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from .condense import condense_body
+from .prompts import CATEGORIES
+
+INDEX_FILE = os.environ.get("NEAR_DUP_INDEX_FILE", "data/cache/near_dup_index.npz")
+# Estimated Jaccard similarity of word shingles needed to reuse a category
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", 0.7))
+NEAR_DUP_SHINGLE = int(os.environ.get("NEAR_DUP_SHINGLE", 3))
+NEAR_DUP_PERMUTATIONS = int(os.environ.get("NEAR_DUP_PERMUTATIONS", 128))
+# bands * rows = permutations; pairs above about (1 / bands) ** (1 / rows) become candidates
+NEAR_DUP_BANDS = int(os.environ.get("NEAR_DUP_BANDS", 32))
+# Texts with fewer distinct shingles (one-line replies) are never matched
+NEAR_DUP_MIN_SHINGLES = int(os.environ.get("NEAR_DUP_MIN_SHINGLES", 8))
+# Learned signatures are written to disk every this many additions (and at exit)
+SAVE_EVERY = int(os.environ.get("NEAR_DUP_SAVE_EVERY", 100))
+
+FIELDS = ("employer_or_recruiter", "job_title")
+
+_TOKEN = re.compile(r"\w+")
+_DIGITS = re.compile(r"\d+")
+
+# Fixed seed: signatures must stay comparable across runs and processes
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, 2 ** 63, size=NEAR_DUP_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, size=NEAR_DUP_PERMUTATIONS, dtype=np.uint64)
+
+_lock = threading.Lock()
+_index = None
+_unsaved = 0
+_stats = {"checked": 0, "answered": 0}
+
+
+def _shingles(text, size=NEAR_DUP_SHINGLE) -> set[str]:
+    # Dates, reference numbers and requisition IDs differ between otherwise identical templates
+    tokens = _TOKEN.findall(_DIGITS.sub("0", text.casefold()))
+    return {" ".join(tokens[i:i + size]) for i in range(max(1, len(tokens) - size + 1))}
+
+
+def signature(text, shingle_size=NEAR_DUP_SHINGLE, min_shingles=NEAR_DUP_MIN_SHINGLES):
+    """Return the MinHash signature of `text`, or None when it is too short to compare."""
+    shingles = _shingles(text, shingle_size)
+    if len(shingles) < max(1, min_shingles):
+        return None
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # Multiply-shift hashing: one independent permutation per column, wrapping in 64 bits
+    permuted = (hashes[:, None] * _A[None, :] + _B[None, :]) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+class MinHashIndex:
+    """Signatures in a growable uint32 matrix, bucketed per LSH band."""
+
+    def __init__(self, bands=NEAR_DUP_BANDS):
+        permutations = NEAR_DUP_PERMUTATIONS
+        if bands < 1 or permutations % bands:
+            raise Exception(f"NEAR_DUP_BANDS ({bands}) must divide NEAR_DUP_PERMUTATIONS ({permutations})")
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = permutations // bands
+        self._signatures = np.zeros((0, permutations), dtype=np.uint32)
+        self.results = []
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.results)
+
+    @property
+    def signatures(self):
+        return self._signatures[:len(self.results)]
+
+    def _keys(self, sig):
+        return [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+    def add(self, signatures, results) -> None:
+        signatures = np.atleast_2d(np.asarray(signatures, dtype=np.uint32))
+        size = len(self.results)
+        if size + len(signatures) > len(self._signatures):
+            # Double the capacity so repeated single additions stay amortised O(1)
+            grown = np.zeros((max(2 * len(self._signatures), size + len(signatures), 64), self.permutations),
+                             dtype=np.uint32)
+            grown[:size] = self.signatures
+            self._signatures = grown
+        self._signatures[size:size + len(signatures)] = signatures
+        for offset, sig in enumerate(signatures):
+            for bucket, key in zip(self._buckets, self._keys(sig)):
+                bucket.setdefault(key, []).append(size + offset)
+        self.results.extend(results)
+
+    def search(self, sig, threshold=NEAR_DUP_THRESHOLD) -> list[tuple[dict, float]]:
+        """Return (result, estimated Jaccard similarity) of indexed emails >= threshold, most similar first."""
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._keys(sig)):
+            candidates.update(bucket.get(key, ()))
+        if not candidates:
+            return []
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = (self._signatures[rows] == sig).mean(axis=1)
+        order = np.argsort(-similarities)
+        return [(self.results[rows[i]], float(similarities[i])) for i in order if similarities[i] >= threshold]
+
+    def save(self, path=INDEX_FILE) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, signatures=self.signatures,
+                 results=np.array([json.dumps(r, ensure_ascii=False) for r in self.results], dtype=str),
+                 params=np.array([self.permutations, NEAR_DUP_SHINGLE]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        """Load the index, or return an empty one if it is missing or built with other parameters."""
+        index = cls()
+        if os.path.exists(path):
+            with np.load(path) as data:
+                if list(data["params"]) == [index.permutations, NEAR_DUP_SHINGLE] and len(data["results"]):
+                    index.add(data["signatures"], [json.loads(str(r)) for r in data["results"]])
+        return index
+
+
+def get_index() -> MinHashIndex:
+    """Return the shared index, loaded from INDEX_FILE on first use."""
+    global _index
+    with _lock:
+        if _index is None:
+            _index = MinHashIndex.load(INDEX_FILE)
+            atexit.register(_save)
+        return _index
+
+
+def _save():
+    global _unsaved
+    with _lock:
+        if _index is not None and _unsaved:
+            _index.save(INDEX_FILE)
+            _unsaved = 0
+
+
+def agree(matches):
+    """Return the best match when every match shares its category, else None."""
+    if not matches or len({result.get("category") for result, _ in matches}) != 1:
+        return None
+    return matches[0]
+
+
+def near_dup_classify(email_text, threshold=NEAR_DUP_THRESHOLD):
+    """Reuse the result of a near-identical earlier email; returns (result or None, signature or None)."""
+    sig = signature(email_text)
+    if sig is None:
+        return None, None
+    index = get_index()
+    with _lock:
+        match = agree(index.search(sig, threshold))
+        _stats["checked"] += 1
+        _stats["answered"] += match is not None
+    if match is None:
+        return None, sig
+
+    previous, similarity = match
+    result = {
+        "category": previous["category"],
+        "confidence": previous.get("confidence"),
+        "rationale": f"Near-duplicate (similarity {similarity:.2f}) of an email classified as {previous['category']}",
+    }
+    text = email_text.casefold()
+    missing = []
+    for field in FIELDS:
+        value = previous.get(field)
+        # Templates swap exactly these values; never carry over one this email does not contain
+        if value and str(value).casefold() not in text:
+            missing.append(field)
+            value = None
+        result[field] = value
+    if missing:
+        result["missing_fields"] = missing
+    return result, sig
+
+
+def remember_template(sig, result) -> None:
+    """Add an LLM-labelled signature to the shared index."""
+    global _unsaved
+    if sig is None or result.get("category") not in CATEGORIES:
+        return
+    stored = {field: result.get(field) for field in ("category", "confidence") + FIELDS}
+    index = get_index()
+    with _lock:
+        index.add([sig], [stored])
+        _unsaved += 1
+        save = _unsaved >= SAVE_EVERY
+    if save:
+        _save()
+
+
+def near_dup_stats() -> dict:
+    """Return how many emails were checked and how many were answered from a near-duplicate."""
+    with _lock:
+        checked, answered = _stats["checked"], _stats["answered"]
+    return {"checked": checked, "answered": answered, "rate": answered / checked if checked else 0.0}
+
+
+def main():
+    from ..storage.sqlite_store import DB_FILE, SqliteStore
+
+    parser = argparse.ArgumentParser(description="Build the near-duplicate index from the SQLite result store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Sign every labelled email in the result store")
+    build.add_argument("--db", default=DB_FILE)
+    build.add_argument("--out", default=INDEX_FILE)
+    args = parser.parse_args()
+
+    store = SqliteStore(args.db)
+    rows = [r for r in store.query() if r["classification"].get("category") in CATEGORIES]
+    store.close()
+    index = MinHashIndex()
+    for row in rows:
+        sig = signature(condense_body(row["email"].get("body", "")))
+        if sig is not None:
+            index.add([sig], [{field: row["classification"].get(field)
+                               for field in ("category", "confidence") + FIELDS}])
+    index.save(args.out)
+    print(f"Indexed {len(index)} of {len(rows)} labelled emails into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@
 """
 Responsibilities:
 - Define the classification prompt used by the LLM
+- Define the incremental prompt for replies in an already classified thread
+- Define the field-extraction prompt for near-duplicates whose category is known
 - Enumerate allowed categories explicitly
 - Instruct the model to return STRICT JSON only
 - Avoid any application logic or API calls
@@ -9,6 +11,15 @@ Responsibilities:
 - Only return a prompt string; do not implement classification or parsing
 """
 
+import json
+
+CATEGORIES = (
+    "application_acknowledged",
+    "application_rejected",
+    "job_opportunity",
+    "not_relevant",
+)
+
 # --- 
 # Simple version of the classification prompt with details.
 # Removed from details:
@@ -59,6 +70,79 @@ EMAIL BODY:
 Do NOT include any commentary or extra text. Only return the JSON object."""
 
 
+# ---
+# Incremental classification of a reply: the thread's latest state plus only the new message.
+# ---
+def get_thread_classification_prompt(email_text: str, previous: dict) -> str:
+    state = {field: previous.get(field) for field in ("category", "employer_or_recruiter", "job_title")}
+    return f"""You are classifying emails related to job applications and recruitment.
+
+The email below is a new message in a conversation that was previously classified as:
+
+{json.dumps(state, ensure_ascii=False)}
+
+Decide the category of the conversation AFTER this new message, choosing EXACTLY ONE of:
+- application_acknowledged
+- application_rejected
+- job_opportunity
+- not_relevant
+
+Follow the DECISION RULES in order:
+1. application_rejected
+2. application_acknowledged
+3. job_opportunity
+4. not_relevant
+
+If the new message does not change the outcome, keep the previous category.
+Keep the previous employer/recruiter name and job title unless the new message states different ones.
+If a requested field is not explicitly found, return null. Do NOT infer or guess missing information.
+
+OUTPUT FORMAT:
+Return ONLY a valid JSON object in the following structure and nothing else:
+
+{{
+  "category": "<one_of_the_allowed_categories>",
+  "confidence": <number between 0 and 1>,
+  "rationale": "<brief explanation without special or newlines characters>",
+  "employer_or_recruiter": "<string or null>",
+  "job_title": "<string or null if stated but do not guess>"
+}}
+
+NEW MESSAGE:
+
+```email
+{email_text}
+```
+
+Do NOT include any commentary or extra text. Only return the JSON object."""
+
+
+# ---
+# Field extraction only, for a near-duplicate whose category is already known.
+# ---
+def get_extraction_prompt(email_text: str, category: str) -> str:
+    return f"""This email has already been classified as {category}.
+
+Extract ONLY the employer/recruiter name and the job title it states.
+If a field is not explicitly found in the email, return null. Do NOT infer or guess missing information.
+
+OUTPUT FORMAT:
+Return ONLY a valid JSON object in the following structure and nothing else:
+
+{{
+  "employer_or_recruiter": "<string or null>",
+  "job_title": "<string or null>"
+}}
+
+EMAIL BODY:
+
+```email
+{email_text}
+```
+
+Do NOT include any commentary or extra text. Only return the JSON object."""
+
+
 # --- 
 # Simple version of the classification prompt without details.
 # --- 
@@ -83,6 +167,56 @@ EMAIL CONTENT:
 Do NOT include any commentary or extra text. Only return the JSON object."""
 
 
+# ---
+# Batched version: several emails per request so the instruction block is
+# processed once per batch instead of once per email.
+# ---
+def get_batch_classification_prompt(emails: list[tuple[str, str]]) -> str:
+    blocks = "\n\n".join(f'```email id="{email_id}"\n{email_text}\n```' for email_id, email_text in emails)
+    return f"""You are classifying emails related to job applications and recruitment.
+
+Below are {len(emails)} emails, each in a block with an id. Classify EACH email independently into
+EXACTLY ONE of the following categories:
+- application_acknowledged
+- application_rejected
+- job_opportunity
+- not_relevant
+
+Follow the DECISION RULES in order:
+1. application_rejected
+2. application_acknowledged
+3. job_opportunity
+4. not_relevant
+
+EXTRACTION RULES:
+- ONLY extract employer/recruiter name and job title when the category is
+  application_acknowledged OR application_rejected.
+- If a requested field is not explicitly found in the email, return null.
+- Do NOT infer or guess missing information.
+
+OUTPUT FORMAT:
+Return ONLY a valid JSON object with one result per email, in the same order, and nothing else:
+
+{{
+  "results": [
+    {{
+      "id": "<email id>",
+      "category": "<one_of_the_allowed_categories>",
+      "confidence": <number between 0 and 1>,
+      "rationale": "<brief explanation without special or newlines characters>",
+      "employer_or_recruiter": "<string or null>",
+      "job_title": "<string or null if stated but do not guess>"
+    }}
+  ]
+}}
+
+EMAILS:
+
+{blocks}
+
+Do NOT include any commentary or extra text. Only return the JSON object."""
+
+
 def get_classification_prompt_original():
     return """You are classifying emails related to job applications and recruitment.
 
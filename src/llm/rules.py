@@ -0,0 +1,113 @@
+# llm/rules.py
+"""
+Responsibilities:
+- Label the obvious emails without calling the LLM
+- Use the decision phrases from llm/prompts.py, compiled into ONE regular
+  expression that scans subject + body in a single pass
+- Only answer when the match is unambiguous; otherwise return None so the
+  email goes to the LLM
+- No HTTP calls, parsing or storage here
+
+Usage Context for Qwen 3 Coder:
+- match_rules(subject: str, body: str) -> dict | None
+    Returns the same structure as the LLM prompt in llm/prompts.py:
+    {"category", "confidence", "rationale", "employer_or_recruiter": None, "job_title": None}
+- rule_stats() -> {"checked": int, "deflected": int, "rate": float}
+- Decision order follows the prompt: application_rejected > application_acknowledged
+- Employer and job title are never extracted by rules
+"""
+
+import re
+import threading
+
+# Phrases that on their own settle the category (see DECISION RULES in prompts.py)
+REJECTION_PHRASES = [
+    "we regret to inform you",
+    "will not be progressing",
+    "not be progressing your application",
+    "will not be moving forward",
+    "decided not to progress",
+    "decided not to proceed with your application",
+    "decided to move forward with other candidates",
+    "decided to pursue other candidates",
+    "your application was unsuccessful",
+    "your application has been unsuccessful",
+    "you have been unsuccessful",
+    "unsuccessful on this occasion",
+    "not been successful on this occasion",
+]
+ACKNOWLEDGED_PHRASES = [
+    "we have received your application",
+    "we've received your application",
+    "your application has been received",
+    "thank you for applying",
+    "thanks for applying",
+    "thank you for your application",
+    "your application is under review",
+    "your application is being reviewed",
+    "application has been submitted",
+]
+# Softer rejection signals: they cannot label on their own, but they make an
+# acknowledgement ambiguous, so the LLM decides
+HEDGE_PHRASES = [
+    "unfortunately",
+    "regret",
+    "unsuccessful",
+    "other candidates",
+]
+
+RULE_CONFIDENCE = 0.95
+
+
+def _alternation(phrases):
+    # Tolerate line breaks and repeated spaces between words
+    return "|".join(r"\s+".join(re.escape(word) for word in phrase.split()) for phrase in phrases)
+
+
+_RULES = re.compile(
+    f"(?P<application_rejected>{_alternation(REJECTION_PHRASES)})"
+    f"|(?P<application_acknowledged>{_alternation(ACKNOWLEDGED_PHRASES)})"
+    f"|(?P<hedge>{_alternation(HEDGE_PHRASES)})",
+    re.IGNORECASE,
+)
+
+_stats = {"checked": 0, "deflected": 0}
+_stats_lock = threading.Lock()
+
+
+def _result(category, phrase):
+    return {
+        "category": category,
+        "confidence": RULE_CONFIDENCE,
+        "rationale": f"Rule match on phrase: {' '.join(phrase.split()).lower()}",
+        "employer_or_recruiter": None,
+        "job_title": None,
+    }
+
+
+def match_rules(subject: str, body: str) -> dict | None:
+    """Return a confident classification for obvious emails, or None for the LLM."""
+    found = {}
+    for match in _RULES.finditer(f"{subject or ''}\n{body or ''}"):
+        found.setdefault(match.lastgroup, match.group(0))
+        # Explicit rejection always overrides all other signals
+        if match.lastgroup == "application_rejected":
+            break
+
+    result = None
+    if "application_rejected" in found:
+        result = _result("application_rejected", found["application_rejected"])
+    elif "application_acknowledged" in found and "hedge" not in found:
+        result = _result("application_acknowledged", found["application_acknowledged"])
+
+    with _stats_lock:
+        _stats["checked"] += 1
+        _stats["deflected"] += result is not None
+    return result
+
+
+def rule_stats() -> dict:
+    """Return how many emails were checked and how many the rules answered."""
+    with _stats_lock:
+        checked, deflected = _stats["checked"], _stats["deflected"]
+    return {"checked": checked, "deflected": deflected, "rate": deflected / checked if checked else 0.0}
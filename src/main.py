@@ -1,59 +1,81 @@
 import sys
 import time
+import metrics
+from imap.actions import ActionBatcher
 from imap.client import EmailClient
-from llm.classify import classify_email
+from pipeline import run_pipeline
+from storage.progress import ProgressJournal
+from storage.threads import ThreadIndex
+
+# Seconds to wait before restarting the watch loop after an unexpected error
+RESTART_DELAY = 60
 
 # Fix Windows terminal encoding for emojis/Unicode
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8')
 
-def process_all_emails():
-    client = EmailClient()
-    
+def report(record):
+    msg = record.get("email") or {}
+
+    print("-" * 40)
+    print(f"FOLDER  : {record['folder']}")
+    print(f"FROM    : {msg.get('from', '')}")
+    print(f"SUBJECT : {msg.get('subject', '')}")
+
+    if "error" in record:
+        print(f"Critical error processing email: {record['error']}")
+        return
+
+    result = record["classification"]
+    category = result.get("category", "Unknown")
+    reason = result.get("reason") or result.get("rationale", "No reason provided")
+
+    if category == "Error":
+        print(f"❌ Classification failed: {reason}")
+    else:
+        print(f"✅ Category: {category}")
+        print(f"📝 Reason: {reason}")
+
+def process_all_emails(client, actions, threads=None):
+    # Fetching, parsing and LLM calls overlap; bounded queues between the
+    # stages keep memory flat however large the 30-day window is
+    for record in run_pipeline(client.iter_unread(), journal=client.journal, threads=threads):
+        report(record)
+        actions.add(record)
+
+def main():
+    # METRICS_PORT / METRICS_JSON: per-stage timings, LLM time and token counts
+    metrics.start()
+    # Per-message checkpoints: a killed run resumes where it stopped
+    client = EmailClient(journal=ProgressJournal())
+    # EMAIL_ACTION_MODE=move|flag: one UID MOVE / UID STORE per folder per batch
+    actions = ActionBatcher(client.action_session)
+    # Duplicates across folders reuse their result; replies are classified against their thread
+    threads = ThreadIndex()
+
     try:
         print("Connecting to mail server...")
         client.connect()
-        emails = client.fetch_unread()
-        
-        if not emails:
-            print("No new emails to process.")
+        if "--once" in sys.argv:
+            process_all_emails(client, actions, threads)
             return
-
-        print(f"Found {len(emails)} unread emails.\n")
-
-        for msg in emails:
-            print("-" * 40)
-            print(f"FROM    : {msg['from']}")
-            print(f"SUBJECT : {msg['subject']}")
-            
-            print("Calling Ollama...")
-            # Classification logic
-            result = classify_email(msg["body"])
-            
-            category = result.get("category", "Unknown")
-            reason = result.get("reason", "No reason provided")
-
-            if category == "Error":
-                print(f"❌ Classification failed: {reason}")
-            else:
-                print(f"✅ Category: {category}")
-                print(f"📝 Reason: {reason}")
-                
-                # Logic to move email could go here
-                # client.move_to_folder(msg['uid'], category)
-
-    except Exception as e:
-        print(f"Critical error in main loop: {e}")
+        # One long-lived session per folder (EMAIL_FOLDER may list several): IDLE
+        # pushes new mail within seconds, and dropped connections are re-established
+        while True:
+            try:
+                for record in run_pipeline(client.watch(), journal=client.journal, threads=threads):
+                    report(record)
+                    actions.add(record)
+            except Exception as e:
+                print(f"Critical error in main loop: {e}; restarting in {RESTART_DELAY}s...")
+                time.sleep(RESTART_DELAY)
+    except KeyboardInterrupt:
+        pass
     finally:
+        actions.close()
+        threads.close()
         client.logout()
         print("\nLogged out safely.")
 
-def main():
-    while True:
-        process_all_emails()
-        print("\nWaiting 5 minutes for next check...")
-        time.sleep(300)
-
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
@@ -0,0 +1,224 @@
+# metrics.py
+"""
+Responsibilities:
+- Per-stage timing spans (fetch, parse, classify, store), queue wait, LLM time and
+  Ollama token counts, rolled up into histograms and counters
+- Expose them as Prometheus text on a local HTTP endpoint and/or a periodic JSON dump
+- Cost next to nothing when off: span() returns a shared no-op context manager and
+  nothing is recorded
+- No pipeline, IMAP or LLM logic here; llm/classify.py reports requests through a hook
+
+Usage Context for Qwen 3 Coder:
+- start(port=METRICS_PORT, json_path=METRICS_JSON, interval=METRICS_INTERVAL) -> None
+    Enables collection when a port or JSON path is configured, serves GET /metrics on
+    127.0.0.1:port and/or rewrites json_path every `interval` seconds
+- enabled() -> bool
+- with span("parse"): ...         -> observes email_sorter_stage_seconds{stage="parse"}
+- observe(name, seconds, **labels) -> histogram
+- inc(name, value=1, **labels)     -> counter
+- render_prometheus() -> str, snapshot() -> dict (same data as JSON)
+- Defaults come from METRICS_PORT, METRICS_JSON and METRICS_INTERVAL (10 s)
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0)) or None
+METRICS_JSON = os.environ.get("METRICS_JSON") or None
+METRICS_INTERVAL = float(os.environ.get("METRICS_INTERVAL", 10))
+
+PREFIX = "email_sorter_"
+# Seconds; spans range from sub-millisecond parses to multi-second LLM calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    "stage_seconds": "Time spent processing one email in a pipeline stage",
+    "queue_wait_seconds": "Time an email waited in the queue in front of a stage",
+    "llm_seconds": "Duration of one Ollama generate request",
+    "emails_total": "Emails that completed a pipeline stage",
+    "errors_total": "Emails that failed in a pipeline stage",
+    "classifications_total": "Stored classifications by category",
+    "llm_requests_total": "Ollama generate requests",
+    "llm_prompt_tokens_total": "Prompt tokens evaluated by Ollama (prompt_eval_count)",
+    "llm_completion_tokens_total": "Tokens generated by Ollama (eval_count)",
+}
+
+_enabled = False
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_NOOP = contextlib.nullcontext()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels) -> None:
+    """Add one observation to histogram `name`."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0, "count": 0}
+        histogram["buckets"][bisect_left(BUCKETS, seconds)] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+
+def inc(name, value=1, **labels) -> None:
+    """Add `value` to counter `name`."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe("stage_seconds", time.perf_counter() - self.start, stage=self.stage)
+        inc("errors_total" if exc_type else "emails_total", stage=self.stage)
+        return False
+
+
+def span(stage):
+    """Time the enclosed block as one email passing through `stage`."""
+    return _Span(stage) if _enabled else _NOOP
+
+
+def record_llm(seconds, prompt_tokens=None, completion_tokens=None) -> None:
+    """Hook for llm/classify.py: one Ollama request and its token counts."""
+    observe("llm_seconds", seconds)
+    inc("llm_requests_total")
+    if prompt_tokens:
+        inc("llm_prompt_tokens_total", prompt_tokens)
+    if completion_tokens:
+        inc("llm_completion_tokens_total", completion_tokens)
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {k: dict(v, buckets=list(v["buckets"])) for k, v in _histograms.items()}
+        counters = dict(_counters)
+    lines = []
+    for kind, metrics in (("histogram", histograms), ("counter", counters)):
+        for name in sorted({name for name, _ in metrics}):
+            lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for (metric, labels), value in sorted(metrics.items()):
+                if metric != name:
+                    continue
+                if kind == "counter":
+                    lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(BUCKETS) + ["+Inf"], value["buckets"]):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {value['sum']}")
+                lines.append(f"{PREFIX}{name}_count{_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _quantile(histogram, q):
+    """Estimate a quantile as the upper bound of the bucket it falls in."""
+    target = q * histogram["count"]
+    cumulative = 0
+    for bound, count in zip(BUCKETS, histogram["buckets"]):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return None
+
+
+def snapshot() -> dict:
+    """Return counters and histogram summaries (count, sum, mean, p50/p95 bucket bounds)."""
+    with _lock:
+        histograms = {k: dict(v, buckets=list(v["buckets"])) for k, v in _histograms.items()}
+        counters = dict(_counters)
+    data = {"time": time.time(), "counters": [], "histograms": []}
+    for (name, labels), value in sorted(counters.items()):
+        data["counters"].append({"name": name, "labels": dict(labels), "value": value})
+    for (name, labels), value in sorted(histograms.items()):
+        data["histograms"].append({
+            "name": name, "labels": dict(labels), "count": value["count"], "sum": value["sum"],
+            "mean": value["sum"] / value["count"] if value["count"] else None,
+            "p50": _quantile(value, 0.5), "p95": _quantile(value, 0.95),
+        })
+    return data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _dump(path, interval):
+    while True:
+        time.sleep(interval)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def start(port=METRICS_PORT, json_path=METRICS_JSON, interval=METRICS_INTERVAL):
+    """Enable collection and start the configured exporters; does nothing when none is configured."""
+    global _enabled
+    if not port and not json_path:
+        return None
+    from llm.classify import add_generate_hook
+
+    _enabled = True
+    add_generate_hook(record_llm)
+    server = None
+    if port:
+        server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Metrics on http://127.0.0.1:{server.server_address[1]}/metrics")
+    if json_path:
+        directory = os.path.dirname(json_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=_dump, args=(json_path, interval), name="metrics-json", daemon=True).start()
+    return server
@@ -0,0 +1,315 @@
+# pipeline.py
+"""
+Responsibilities:
+- Run fetch -> parse -> classify -> store as concurrent stages
+- Bounded queues between stages: a slow stage pushes back on the ones before it,
+  so peak memory depends on queue depth, not on mailbox size
+- Per-stage worker counts (IMAP, CPU-bound parsing and LLM calls overlap)
+- Optionally parse on a process pool (imap/parser.parse_many) so backfills are not held to
+  one core by the GIL
+- Per-email failures are reported, never fatal to the run
+- Time every stage and the queue wait in front of it (metrics.py; free when metrics are off)
+- No parsing, classification or storage logic here; stages are injected
+
+Usage Context for Qwen 3 Coder:
+- run_pipeline(records, parse_workers=PARSE_WORKERS, classify_workers=CLASSIFY_WORKERS,
+               queue_size=QUEUE_SIZE, parse=parse_rfc822, classify=..., store=...) -> iterator
+    `records` is any iterable of {"account", "folder", "uid", "raw"} dicts,
+    e.g. EmailClient.iter_unread() or EmailClient.watch()
+    flush=... makes everything `store` has accepted durable (default: both result stores)
+    parse_processes > 1 parses in that many worker processes (parse_rfc822, chunks of
+    PARSE_CHUNK_SIZE; `parse` and `parse_workers` are then unused). Meant for backfills:
+    a chunk is only parsed once full or at the end of the stream, so watch mode keeps threads
+    Yields each record once it has been stored (or has failed), in completion order:
+        - 'email': parsed dict (raw bytes are dropped after parsing)
+        - 'classification': classifier result
+        - 'error': str, only present when a stage raised
+- Closing the iterator stops every stage
+- journal=ProgressJournal() checkpoints every record after each stage. A restarted run
+  skips mail that was already stored and reuses classifications that were already made,
+  so LLM work is never repeated after a crash. A record is checkpointed as stored only after
+  flush() has put it on disk (every STORE_BATCH records, and whenever the store stage is idle).
+  Failed records (including classifier "Error" results, which are never stored) are recorded
+  with journal.fail and stay unfinished, so the source fetches them again. Only parse failures
+  count towards MAX_ATTEMPTS, after which the record is marked "failed" and skipped from then
+  on (python -m src.storage.progress requeue processes those again)
+- threads=ThreadIndex() makes classification thread-aware: a Message-ID that was already
+  classified (the same mail in another folder) reuses its result, the account's own replies
+  keep the thread's state, and other replies are judged incrementally against the thread's
+  latest classification. `classify` is then called as classify(email, thread_state)
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from email.utils import parseaddr
+
+import metrics
+from imap.parser import parse_many, parse_rfc822
+from llm.classify import CONCURRENCY, classify_email, inherit_thread_state
+from storage import jsonl_store, sqlite_store
+from storage.progress import message_key
+
+PARSE_WORKERS = int(os.environ.get("PIPELINE_PARSE_WORKERS", 2))
+# LLM calls dominate; match the number of requests Ollama serves in parallel
+CLASSIFY_WORKERS = int(os.environ.get("PIPELINE_CLASSIFY_WORKERS", CONCURRENCY))
+# Records buffered between two stages
+QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 32))
+# Stored records per flush; a partial batch is flushed as soon as the store stage goes idle
+STORE_BATCH = int(os.environ.get("PIPELINE_STORE_BATCH", 32))
+STORE_IDLE_SECONDS = 0.2
+
+_DONE = object()
+
+def _classify(email, thread_state=None):
+    return classify_email(email["body"], subject=email["subject"], thread_state=thread_state)
+
+def _is_own(record):
+    """True when the account itself sent the message (a reply the candidate wrote)."""
+    sender = parseaddr(record["email"].get("from", ""))[1].lower()
+    return bool(sender) and sender == str(record.get("account") or "").lower()
+
+def _store(record):
+    data = {"email": record["email"], "classification": record["classification"]}
+    jsonl_store.store_email_classification(data)
+    sqlite_store.store_email_classification(data)
+
+def _flush():
+    jsonl_store.flush()
+    sqlite_store.flush()
+
+def _put(q, item, stop):
+    """Block until `item` is queued or the pipeline is stopped."""
+    if metrics.enabled() and isinstance(item, dict):
+        item["queued_at"] = time.perf_counter()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            pass
+    return _DONE
+
+def _start_stage(work, inbox, outbox, failed, workers, stop, name):
+    """Run `work(record)` on `workers` threads between two queues.
+
+    Records that raise skip the remaining stages and go straight to `failed`.
+    The last worker to see the end marker passes it downstream.
+    """
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def run():
+        while True:
+            record = _get(inbox, stop)
+            if record is _DONE:
+                # Let sibling workers see the end marker too
+                _put(inbox, _DONE, stop)
+                break
+            if "queued_at" in record:
+                metrics.observe("queue_wait_seconds", time.perf_counter() - record.pop("queued_at"), stage=name)
+            try:
+                with metrics.span(name):
+                    work(record)
+            except Exception as e:
+                record["error"] = f"{name}: {e}"
+                _put(failed, record, stop)
+                continue
+            _put(outbox, record, stop)
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            _put(outbox, _DONE, stop)
+
+    for i in range(workers):
+        threading.Thread(target=run, name=f"pipeline-{name}-{i}", daemon=True).start()
+
+def run_pipeline(records, parse_workers=PARSE_WORKERS, classify_workers=CLASSIFY_WORKERS,
+                 queue_size=QUEUE_SIZE, parse=parse_rfc822, classify=_classify, store=_store, journal=None,
+                 threads=None, flush=_flush, parse_processes=0):
+    """Stream `records` through parse, classify and store stages running concurrently."""
+    stop = threading.Event()
+    to_parse = queue.Queue(queue_size)
+    to_classify = queue.Queue(queue_size)
+    to_store = queue.Queue(queue_size)
+    finished = queue.Queue(queue_size)
+    source_error = []
+    # Keys being processed: a retry fetched while the first attempt is still in flight is skipped
+    in_flight = set()
+    in_flight_lock = threading.Lock()
+
+    def checkpoint(record, stage, classification=None):
+        if journal is not None:
+            journal.mark(record["key"], stage, record.get("source"), record.get("uid"), classification)
+
+    def fetch():
+        try:
+            # In watch mode this also counts the time spent waiting for new mail
+            started = time.perf_counter()
+            for record in records:
+                if metrics.enabled():
+                    metrics.observe("stage_seconds", time.perf_counter() - started, stage="fetch")
+                    metrics.inc("emails_total", stage="fetch")
+                if journal is not None:
+                    record["key"] = message_key(record["raw"])
+                    previous = journal.lookup(record["key"])
+                    if previous and previous["stage"] in ("stored", "failed"):
+                        continue
+                    with in_flight_lock:
+                        if record["key"] in in_flight:
+                            continue
+                        in_flight.add(record["key"])
+                    # Recorded before the source moves on, so an interrupted run fetches it again
+                    checkpoint(record, "fetched")
+                    if previous and previous["classification"] is not None:
+                        record["classification"] = previous["classification"]
+                if not _put(to_parse, record, stop):
+                    return
+                started = time.perf_counter()
+        except Exception as e:
+            source_error.append(e)
+        _put(to_parse, _DONE, stop)
+
+    def parse_record(record):
+        record["email"] = parse(record.pop("raw"))
+        checkpoint(record, "parsed")
+
+    def parse_in_processes():
+        # parse_many keeps input order, so results are matched to records first in, first out
+        waiting = deque()
+
+        def raws():
+            while True:
+                record = _get(to_parse, stop)
+                if record is _DONE:
+                    return
+                record.pop("queued_at", None)
+                waiting.append(record)
+                yield record.pop("raw")
+
+        started = time.perf_counter()
+        for email in parse_many(raws(), parse_processes, return_exceptions=True):
+            record = waiting.popleft()
+            if metrics.enabled():
+                metrics.observe("stage_seconds", time.perf_counter() - started, stage="parse")
+            if isinstance(email, Exception):
+                record["error"] = f"parse: {email}"
+                _put(finished, record, stop)
+            else:
+                record["email"] = email
+                checkpoint(record, "parsed")
+                _put(to_classify, record, stop)
+            started = time.perf_counter()
+        _put(to_classify, _DONE, stop)
+
+    def classify_thread_member(record):
+        email = record["email"]
+        thread = threads.lookup(email)
+        if thread["duplicate"] is not None:
+            # Same Message-ID already classified: another folder, or a resent copy
+            metrics.inc("thread_decisions_total", decision="duplicate")
+            return thread["duplicate"]
+        if thread["latest"] is not None and _is_own(record):
+            metrics.inc("thread_decisions_total", decision="own_reply")
+            result = inherit_thread_state(thread["latest"], "Own reply in an already classified thread")
+        else:
+            metrics.inc("thread_decisions_total", decision="new_thread" if thread["latest"] is None else "reply")
+            result = classify(email, thread["latest"])
+        if result.get("category") != "Error":
+            threads.record(email, thread["thread_id"], result)
+        return result
+
+    def classify_record(record):
+        if "classification" in record:
+            return  # Classified before an interruption
+        if threads is None:
+            result = classify(record["email"])
+        else:
+            result = classify_thread_member(record)
+        if result.get("category") == "Error":
+            # Never stored: the record stays unfinished and is fetched again on the next sync
+            raise Exception(result.get("reason", "classification failed"))
+        record["classification"] = result
+        checkpoint(record, "classified", result)
+
+    def store_records():
+        # A single writer keeps result files and the database free of lock contention
+        pending = []
+
+        def commit():
+            # Checkpointed only once the results are on disk; a kill before this re-runs the records
+            try:
+                flush()
+            except Exception as e:
+                for record in pending:
+                    record["error"] = f"store: {e}"
+            for record in pending:
+                if "error" not in record:
+                    checkpoint(record, "stored")
+                    category = record["classification"].get("category", "Unknown")
+                    metrics.inc("classifications_total", category=category)
+                _put(finished, record, stop)
+            pending.clear()
+
+        while not stop.is_set():
+            try:
+                record = to_store.get(timeout=STORE_IDLE_SECONDS if pending else 0.5)
+            except queue.Empty:
+                if pending:
+                    commit()
+                continue
+            if record is _DONE:
+                commit()
+                _put(finished, _DONE, stop)
+                return
+            if "queued_at" in record:
+                metrics.observe("queue_wait_seconds", time.perf_counter() - record.pop("queued_at"), stage="store")
+            try:
+                with metrics.span("store"):
+                    store(record)
+            except Exception as e:
+                record["error"] = f"store: {e}"
+                _put(finished, record, stop)
+                continue
+            pending.append(record)
+            if len(pending) >= max(1, STORE_BATCH):
+                commit()
+
+    threading.Thread(target=fetch, name="pipeline-fetch", daemon=True).start()
+    if parse_processes > 1:
+        threading.Thread(target=parse_in_processes, name="pipeline-parse", daemon=True).start()
+    else:
+        _start_stage(parse_record, to_parse, to_classify, finished, max(1, parse_workers), stop, "parse")
+    _start_stage(classify_record, to_classify, to_store, finished, max(1, classify_workers), stop, "classify")
+    threading.Thread(target=store_records, name="pipeline-store", daemon=True).start()
+
+    try:
+        while True:
+            record = _get(finished, stop)
+            if record is _DONE:
+                break
+            record.pop("queued_at", None)
+            if journal is not None and "key" in record:
+                # A message that cannot be parsed never will be; an unreachable LLM or a full disk
+                # says nothing about the message, so those failures are retried indefinitely
+                if "error" in record and journal.fail(record["key"], record["error"], record.get("source"),
+                                                      record.get("uid"), record["error"].startswith("parse:")):
+                    record["error"] += " (giving up after repeated failures)"
+                with in_flight_lock:
+                    in_flight.discard(record["key"])
+            yield record
+        if source_error:
+            raise source_error[0]
+    finally:
+        stop.set()
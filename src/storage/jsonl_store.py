@@ -0,0 +1,158 @@
+# storage/jsonl_store.py
+"""
+Responsibilities:
+- Persist classification results as JSON Lines: one JSON object per line, append-only
+- Constant cost per stored email, however large the results file grows
+- Buffer writes and fsync in batches (every N records or T seconds) and at exit
+- Stream results back without loading the whole file
+- Convert to and from the JSON array format written by storage/json_store.py
+- No domain logic, parsing, or classification here
+
+Usage Context for Qwen 3 Coder:
+- store_email_classification(data: dict) -> None
+    Same contract as storage/json_store.py; appends to data/results/results YYYYMMDD HHMM.jsonl
+- flush() -> None, forces buffered records to disk
+- close() -> None, flushes and closes the current run's file
+- JsonlWriter(path, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL) for explicit files
+- iter_results(path) -> Iterator[dict]
+    A torn final line (crash mid-write) is skipped, never fatal
+- convert_json_to_jsonl(src, dst) / convert_jsonl_to_json(src, dst)
+- CLI: python -m src.storage.jsonl_store to-jsonl|to-json SRC DST
+"""
+
+from datetime import datetime
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+
+FSYNC_EVERY = int(os.environ.get("STORE_FSYNC_EVERY", 50))
+FSYNC_INTERVAL = float(os.environ.get("STORE_FSYNC_INTERVAL", 2.0))
+
+
+class JsonlWriter:
+    """Append-only JSON Lines writer with batched fsync."""
+
+    def __init__(self, path, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, data: dict) -> None:
+        line = json.dumps(data, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+
+__writer = None
+__writer_lock = threading.Lock()
+
+def __init_state():
+    global __writer
+    with __writer_lock:
+        if __writer is None:
+            now = datetime.now().strftime("%Y%m%d %H%M")
+            __writer = JsonlWriter(f"data/results/results {now}.jsonl")
+            atexit.register(__writer.close)
+        return __writer
+
+
+def store_email_classification(data: dict) -> None:
+    """Append a single email classification result to the JSON Lines store."""
+    __init_state().write(data)
+
+
+def flush() -> None:
+    """Force buffered results of the current run to disk."""
+    if __writer is not None:
+        __writer.flush()
+
+
+def close() -> None:
+    """Flush and close the current run's file; the next store opens a new one."""
+    global __writer
+    with __writer_lock:
+        if __writer is not None:
+            __writer.close()
+            __writer = None
+
+
+def iter_results(path):
+    """Yield stored results one at a time, skipping a torn or blank line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Only an interrupted final write can leave a partial line
+                continue
+
+
+def convert_json_to_jsonl(src, dst) -> int:
+    """Convert a json_store array file into JSON Lines; returns the record count."""
+    with open(src, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    writer = JsonlWriter(dst, fsync_every=len(records) or 1)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    return len(records)
+
+
+def convert_jsonl_to_json(src, dst) -> int:
+    """Convert JSON Lines into the indented array format of json_store; returns the record count."""
+    count = 0
+    with open(dst, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in iter_results(src):
+            f.write(",\n  " if count else "\n  ")
+            f.write(json.dumps(record, indent=2).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert classification results between JSON and JSON Lines.")
+    parser.add_argument("direction", choices=["to-jsonl", "to-json"])
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    args = parser.parse_args()
+    convert = convert_json_to_jsonl if args.direction == "to-jsonl" else convert_jsonl_to_json
+    print(f"Converted {convert(args.src, args.dst)} records to {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# storage/progress.py
+"""
+Responsibilities:
+- Durable per-message progress records for processing runs: fetched -> parsed -> classified -> stored
+- Each checkpoint is its own SQLite transaction, so a crash never leaves a half-written record
+- Keep the classification once it is known, so a restarted run never repeats LLM work
+- List messages that were fetched but never stored, so they can be fetched again
+- Count failed attempts (classification errors, parse errors): a failed message keeps its
+  stage, so it is retried instead of being stored as an error. Only permanent failures (mail
+  that can never be parsed) count towards MAX_ATTEMPTS, after which the message moves to the
+  terminal "failed" stage; transient ones (Ollama unreachable) are retried indefinitely
+- Requeue "failed" messages, so they are processed again on the next run
+- No IMAP access, parsing or classification here
+
+Usage Context for Qwen 3 Coder:
+- journal = ProgressJournal(path=PROGRESS_FILE)
+- message_key(raw_bytes) -> str, content hash identifying one message across runs
+- journal.mark(key, stage, source=None, uid=None, classification=None) -> None
+    stage is one of STAGES; a record never moves backwards
+- journal.lookup(key) -> {"stage": str, "classification": dict | None} | None
+- journal.fail(key, error, source=None, uid=None, permanent=True) -> bool, record one failed
+    attempt; True when this was the last one (the MAX_ATTEMPTS-th permanent failure,
+    EMAIL_MAX_ATTEMPTS environment variable, default 5). permanent=False never gives up
+- journal.requeue(source=None) -> int, move "failed" messages (of one source, or all) back to
+    "fetched" with their attempts reset; returns how many
+- journal.unfinished(source, failed_only=False) -> list[int], UIDs of `source` not yet stored;
+    failed_only=True limits this to messages with a failed attempt (not those still in flight)
+- journal.stats() -> {stage: count}
+- `source` is the folder key from imap/sync_state.folder_key
+- path defaults to EMAIL_PROGRESS_DB environment variable or "data/state/progress.sqlite3"
+- CLI: python -m src.storage.progress [--db PATH] stats | requeue [--source KEY]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+PROGRESS_FILE = os.environ.get("EMAIL_PROGRESS_DB", "data/state/progress.sqlite3")
+# Permanent failures (e.g. parse errors) before a message is given up on
+MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", 5))
+
+# "failed" is terminal, like "stored": neither is fetched or processed again
+STAGES = ("fetched", "parsed", "classified", "stored", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    key TEXT PRIMARY KEY,
+    source TEXT,
+    uid INTEGER,
+    stage INTEGER NOT NULL,
+    classification TEXT,
+    updated_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    permanent_failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_progress_source ON progress (source, stage);
+"""
+
+_MARK = """
+INSERT INTO progress (key, source, uid, stage, classification, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    source = COALESCE(excluded.source, source),
+    uid = COALESCE(excluded.uid, uid),
+    stage = MAX(stage, excluded.stage),
+    classification = COALESCE(excluded.classification, classification),
+    updated_at = excluded.updated_at
+"""
+
+_FAIL = """
+INSERT INTO progress (key, source, uid, stage, updated_at, attempts, error, permanent_failures)
+VALUES (?, ?, ?, CASE WHEN ? > 0 AND ? <= 1 THEN ? ELSE 0 END, ?, 1, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    source = COALESCE(excluded.source, source),
+    uid = COALESCE(excluded.uid, uid),
+    stage = CASE WHEN excluded.permanent_failures > 0 AND permanent_failures + 1 >= ? THEN ? ELSE stage END,
+    attempts = attempts + 1,
+    permanent_failures = permanent_failures + excluded.permanent_failures,
+    error = excluded.error,
+    updated_at = excluded.updated_at
+"""
+
+_REQUEUE = """
+UPDATE progress SET stage = 0, attempts = 0, permanent_failures = 0, error = NULL, updated_at = ?
+WHERE stage = ? AND (? IS NULL OR source = ?)
+"""
+
+
+def message_key(raw_bytes: bytes) -> str:
+    """Identify a message by content, so refetches and UIDVALIDITY changes map to the same record."""
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+
+class ProgressJournal:
+    """Per-message checkpoint store; safe to share between pipeline threads."""
+
+    def __init__(self, path=PROGRESS_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(progress)")}
+        # Journals written before attempts were counted
+        if "attempts" not in columns:
+            self._db.execute("ALTER TABLE progress ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            self._db.execute("ALTER TABLE progress ADD COLUMN error TEXT")
+        if "permanent_failures" not in columns:
+            self._db.execute("ALTER TABLE progress ADD COLUMN permanent_failures INTEGER NOT NULL DEFAULT 0")
+        self._db.commit()
+
+    def mark(self, key, stage, source=None, uid=None, classification=None) -> None:
+        """Record that `key` reached `stage`; committed before returning."""
+        if stage not in STAGES:
+            raise Exception(f"Unknown progress stage: {stage}")
+        payload = json.dumps(classification, ensure_ascii=False) if classification is not None else None
+        with self._lock, self._db:
+            self._db.execute(_MARK, (key, source, uid, STAGES.index(stage), payload,
+                                     datetime.now().isoformat(timespec="seconds")))
+
+    def lookup(self, key) -> dict | None:
+        """Return the furthest stage reached by `key` and its classification, if any."""
+        with self._lock:
+            row = self._db.execute("SELECT stage, classification FROM progress WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {"stage": STAGES[row[0]], "classification": json.loads(row[1]) if row[1] else None}
+
+    def fail(self, key, error, source=None, uid=None, permanent=True, max_attempts=MAX_ATTEMPTS) -> bool:
+        """Record a failed attempt; the stage is kept (so unfinished() still returns the
+        message) until the `max_attempts`-th permanent failure, which marks it "failed".
+        Transient failures (permanent=False) are counted in 'attempts' but never give up."""
+        failed = STAGES.index("failed")
+        permanent = int(bool(permanent))
+        with self._lock, self._db:
+            self._db.execute(_FAIL, (key, source, uid, permanent, max_attempts, failed,
+                                     datetime.now().isoformat(timespec="seconds"), str(error), permanent,
+                                     max_attempts, failed))
+            row = self._db.execute("SELECT stage FROM progress WHERE key = ?", (key,)).fetchone()
+        return row[0] == failed
+
+    def requeue(self, source=None) -> int:
+        """Give "failed" messages (of `source`, or all) a fresh set of attempts; returns how many."""
+        with self._lock, self._db:
+            return self._db.execute(_REQUEUE, (datetime.now().isoformat(timespec="seconds"),
+                                               STAGES.index("failed"), source, source)).rowcount
+
+    def unfinished(self, source, failed_only=False) -> list[int]:
+        """Return the UIDs of `source` that were fetched but never stored."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT uid FROM progress WHERE source = ? AND stage < ? AND uid IS NOT NULL"
+                + (" AND attempts > 0" if failed_only else "") + " ORDER BY uid",
+                (source, STAGES.index("stored")),
+            ).fetchall()
+        return [uid for (uid,) in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT stage, COUNT(*) FROM progress GROUP BY stage").fetchall()
+        counts = {stage: 0 for stage in STAGES}
+        for stage, count in rows:
+            counts[STAGES[stage]] = count
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the progress journal or requeue failed messages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Count messages per stage")
+    requeue = commands.add_parser("requeue", help="Process \"failed\" messages again on the next run")
+    requeue.add_argument("--source", help="Only this folder key (imap/sync_state.folder_key) or archive path")
+    parser.add_argument("--db", default=PROGRESS_FILE)
+    args = parser.parse_args()
+
+    journal = ProgressJournal(args.db)
+    try:
+        if args.command == "requeue":
+            print(f"Requeued {journal.requeue(args.source)} failed messages")
+        else:
+            for stage, count in journal.stats().items():
+                print(f"{stage:>10}: {count}")
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# storage/sqlite_store.py
+"""
+Responsibilities:
+- Persist classification results in an indexed SQLite database
+- One row per email, keyed by Message-ID: reprocessed mail updates its row (upsert)
+- Indexes on date, category and employer_or_recruiter for fast lookups
+- Batch inserts into a single transaction; buffered rows are also committed every
+  RESULTS_DB_COMMIT_INTERVAL seconds, so other processes see results while mail trickles in
+- Import existing JSON array (json_store) and JSON Lines (jsonl_store) result files
+- No domain logic, parsing, or classification here
+
+Usage Context for Qwen 3 Coder:
+- store_email_classification(data: dict) -> None
+    Same contract as storage/json_store.py; writes to data/results/results.sqlite3
+- flush() -> None, commit the buffered results of store_email_classification
+- store = SqliteStore(path=DB_FILE, batch_size=BATCH_SIZE, commit_interval=COMMIT_INTERVAL)
+    store.store(data)              -> buffered upsert, committed every `batch_size` records
+                                      or within `commit_interval` seconds (0 disables the timer)
+    store.store_many(records)      -> one transaction
+    store.flush() / store.close()
+    store.get(message_id)          -> dict | None
+    store.query(category=None, employer=None, since=None, until=None, limit=None) -> list[dict]
+    store.import_files(paths)      -> number of records imported
+- Returned rows contain the original {"email": ..., "classification": ...} structure
+- Emails without a Message-ID are keyed by a hash of from/date/subject/body
+- CLI: python -m src.storage.sqlite_store import|query|get ...
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DB_FILE = os.environ.get("RESULTS_DB", "data/results/results.sqlite3")
+BATCH_SIZE = int(os.environ.get("RESULTS_DB_BATCH_SIZE", 100))
+# Longest time a stored result stays uncommitted (invisible to other readers)
+COMMIT_INTERVAL = float(os.environ.get("RESULTS_DB_COMMIT_INTERVAL", 2.0))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    message_id TEXT PRIMARY KEY,
+    date TEXT,
+    sender TEXT,
+    subject TEXT,
+    category TEXT,
+    confidence REAL,
+    employer_or_recruiter TEXT COLLATE NOCASE,
+    job_title TEXT,
+    email_json TEXT NOT NULL,
+    classification_json TEXT NOT NULL,
+    stored_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_classifications_date ON classifications (date);
+CREATE INDEX IF NOT EXISTS idx_classifications_category ON classifications (category, date);
+CREATE INDEX IF NOT EXISTS idx_classifications_employer ON classifications (employer_or_recruiter, date);
+"""
+
+_UPSERT = """
+INSERT INTO classifications (message_id, date, sender, subject, category, confidence,
+                             employer_or_recruiter, job_title, email_json, classification_json, stored_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(message_id) DO UPDATE SET
+    date = excluded.date, sender = excluded.sender, subject = excluded.subject,
+    category = excluded.category, confidence = excluded.confidence,
+    employer_or_recruiter = excluded.employer_or_recruiter, job_title = excluded.job_title,
+    email_json = excluded.email_json, classification_json = excluded.classification_json,
+    stored_at = excluded.stored_at
+"""
+
+
+def message_key(email: dict) -> str:
+    """Return the Message-ID, or a stable content hash when the header is missing."""
+    message_id = (email.get("message_id") or "").strip()
+    if message_id:
+        return message_id
+    digest = hashlib.sha256()
+    for field in ("from", "date", "subject", "body"):
+        digest.update(str(email.get(field, "")).encode("utf-8", errors="ignore"))
+        digest.update(b"\0")
+    return f"<sha256:{digest.hexdigest()}>"
+
+
+def _row(data: dict) -> tuple:
+    email = data.get("email") or {}
+    classification = data.get("classification") or {}
+    if isinstance(classification, str):
+        try:
+            classification = json.loads(classification)
+        except json.JSONDecodeError:
+            classification = {"raw": classification}
+    confidence = classification.get("confidence")
+    return (
+        message_key(email),
+        email.get("date"),
+        email.get("from"),
+        email.get("subject"),
+        classification.get("category"),
+        confidence if isinstance(confidence, (int, float)) else None,
+        classification.get("employer_or_recruiter"),
+        classification.get("job_title"),
+        json.dumps(email, ensure_ascii=False),
+        json.dumps(classification, ensure_ascii=False),
+        datetime.now().isoformat(timespec="seconds"),
+    )
+
+
+def _iter_file(path):
+    if path.endswith(".jsonl"):
+        from .jsonl_store import iter_results
+        yield from iter_results(path)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            yield from json.load(f)
+        except json.JSONDecodeError:
+            return
+
+
+class SqliteStore:
+    """Indexed, upserting SQLite result store; safe to share between threads."""
+
+    def __init__(self, path=DB_FILE, batch_size=BATCH_SIZE, commit_interval=COMMIT_INTERVAL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self._closed = threading.Event()
+        if commit_interval > 0:
+            threading.Thread(target=self._commit_every, args=(commit_interval,), name="sqlite-store-commit",
+                             daemon=True).start()
+
+    def _commit_every(self, interval):
+        # A watch-mode run may take days to fill a batch; readers should not wait that long
+        while not self._closed.wait(interval):
+            self.flush()
+
+    def store(self, data: dict) -> None:
+        """Buffer one result; the buffer is committed every `batch_size` records."""
+        with self._lock:
+            self._pending.append(_row(data))
+            if len(self._pending) >= self.batch_size:
+                self._commit()
+
+    def store_many(self, records) -> int:
+        """Upsert many results in one transaction; returns the number stored."""
+        rows = [_row(r) for r in records]
+        with self._lock:
+            self._pending.extend(rows)
+            self._commit()
+        return len(rows)
+
+    def _commit(self):
+        if self._pending:
+            with self._db:
+                self._db.executemany(_UPSERT, self._pending)
+            self._pending = []
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._closed.is_set():
+                self._commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._commit()
+            self._db.close()
+
+    def _decode(self, rows):
+        return [{"email": json.loads(e), "classification": json.loads(c)} for e, c in rows]
+
+    def get(self, message_id: str) -> dict | None:
+        """Return the stored result for one Message-ID."""
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT email_json, classification_json FROM classifications WHERE message_id = ?",
+                (message_id.strip(),),
+            ).fetchall()
+        decoded = self._decode(rows)
+        return decoded[0] if decoded else None
+
+    def query(self, category=None, employer=None, since=None, until=None, limit=None) -> list[dict]:
+        """Return results matching every given filter, newest first.
+
+        `employer` matches case-insensitively as a substring; `since`/`until`
+        are "YYYY-MM-DD" or "YYYY-MM-DD HH:MM" strings, like the stored dates.
+        """
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if employer:
+            clauses.append("employer_or_recruiter LIKE ?")
+            params.append(f"%{employer}%")
+        if since:
+            clauses.append("date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("date < ?")
+            params.append(until)
+        sql = "SELECT email_json, classification_json FROM classifications"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY date DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return self._decode(rows)
+
+    def import_files(self, paths) -> int:
+        """Import json_store (.json) and jsonl_store (.jsonl) result files."""
+        total = 0
+        for path in paths:
+            total += self.store_many(_iter_file(path))
+        return total
+
+
+__store = None
+__store_lock = threading.Lock()
+
+def __init_state():
+    global __store
+    with __store_lock:
+        if __store is None:
+            __store = SqliteStore()
+            atexit.register(__store.close)
+        return __store
+
+
+def store_email_classification(data: dict) -> None:
+    """Upsert a single email classification result into the SQLite store."""
+    __init_state().store(data)
+
+
+def flush() -> None:
+    """Commit results buffered by store_email_classification."""
+    if __store is not None:
+        __store.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or import the SQLite classification store.")
+    parser.add_argument("--db", default=DB_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Import .json/.jsonl result files")
+    importer.add_argument("paths", nargs="+")
+    query = commands.add_parser("query", help="List stored results")
+    query.add_argument("--category")
+    query.add_argument("--employer")
+    query.add_argument("--since")
+    query.add_argument("--until")
+    query.add_argument("--limit", type=int)
+    getter = commands.add_parser("get", help="Show one result by Message-ID")
+    getter.add_argument("message_id")
+    args = parser.parse_args()
+
+    store = SqliteStore(args.db)
+    try:
+        if args.command == "import":
+            print(f"Imported {store.import_files(args.paths)} records into {args.db}")
+        elif args.command == "get":
+            print(json.dumps(store.get(args.message_id), indent=2, ensure_ascii=False))
+        else:
+            for row in store.query(args.category, args.employer, args.since, args.until, args.limit):
+                email, result = row["email"], row["classification"]
+                print(f"{email.get('date', ''):<16}  {result.get('category', ''):<24}  "
+                      f"{result.get('employer_or_recruiter') or '-':<24}  {email.get('subject', '')}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
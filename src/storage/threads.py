@@ -0,0 +1,139 @@
+# storage/threads.py
+"""
+Responsibilities:
+- Group messages into threads using Message-ID, In-Reply-To and References
+- Remember every classified Message-ID, so copies of the same mail (other folders,
+  refetches with different transport headers) are recognised as exact duplicates
+- Keep each thread's latest state: the classification of its newest message
+- Durable in SQLite and safe to share between pipeline threads
+- No IMAP access, parsing or classification here
+
+Usage Context for Qwen 3 Coder:
+- index = ThreadIndex(path=THREADS_FILE)
+- index.lookup(email) -> {"thread_id": str, "duplicate": dict | None, "latest": dict | None}
+    `email` is a parse_rfc822 dict; 'duplicate' is the stored classification when this
+    Message-ID was seen before, 'latest' is the thread's newest classification (None for a new thread)
+- index.record(email, thread_id, classification) -> None
+    The thread's latest state only moves forward in time, so mail arriving out of order
+    never overwrites a newer state
+- index.stats() -> {"messages": int, "threads": int}
+- Emails without a Message-ID are keyed by a content hash (sqlite_store.message_key)
+- path defaults to EMAIL_THREADS_DB environment variable or "data/state/threads.sqlite3"
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from .sqlite_store import message_key
+
+THREADS_FILE = os.environ.get("EMAIL_THREADS_DB", "data/state/threads.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    message_id TEXT PRIMARY KEY,
+    thread_id TEXT NOT NULL,
+    date TEXT,
+    classification TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages (thread_id);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    date TEXT,
+    classification TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+_RECORD_THREAD = """
+INSERT INTO threads (thread_id, message_id, date, classification, messages, updated_at)
+VALUES (?, ?, ?, ?, 1, ?)
+ON CONFLICT(thread_id) DO UPDATE SET
+    message_id = CASE WHEN excluded.date >= COALESCE(date, '') THEN excluded.message_id ELSE message_id END,
+    classification = CASE WHEN excluded.date >= COALESCE(date, '') THEN excluded.classification ELSE classification END,
+    date = MAX(COALESCE(date, ''), excluded.date),
+    messages = messages + 1,
+    updated_at = excluded.updated_at
+"""
+
+
+def _parents(email: dict) -> list[str]:
+    """Return the Message-IDs this email refers to, nearest parent first."""
+    parents = list(reversed(email.get("references") or []))
+    in_reply_to = email.get("in_reply_to") or ""
+    if in_reply_to and in_reply_to not in parents:
+        parents.insert(0, in_reply_to)
+    return parents
+
+
+class ThreadIndex:
+    """Message-ID -> thread map with the latest classification of every thread."""
+
+    def __init__(self, path=THREADS_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def _thread_id(self, email: dict) -> str:
+        parents = _parents(email)
+        if parents:
+            placeholders = ",".join("?" * len(parents))
+            rows = dict(self._db.execute(
+                f"SELECT message_id, thread_id FROM messages WHERE message_id IN ({placeholders})", parents
+            ).fetchall())
+            for parent in parents:
+                if parent in rows:
+                    return rows[parent]
+            # Parent not seen yet: the thread root (first reference) still groups the replies
+            references = email.get("references") or []
+            return references[0] if references else parents[0]
+        return message_key(email)
+
+    def lookup(self, email: dict) -> dict:
+        """Return the thread of `email`, its earlier classification if it is a duplicate, and the thread state."""
+        key = message_key(email)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT thread_id, classification FROM messages WHERE message_id = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                return {"thread_id": row[0], "duplicate": json.loads(row[1]), "latest": None}
+            thread_id = self._thread_id(email)
+            row = self._db.execute(
+                "SELECT classification FROM threads WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return {"thread_id": thread_id, "duplicate": None, "latest": json.loads(row[0]) if row else None}
+
+    def record(self, email: dict, thread_id: str, classification: dict) -> None:
+        """Remember the classification of `email` and advance its thread's state."""
+        key = message_key(email)
+        date = email.get("date") or ""
+        payload = json.dumps(classification, ensure_ascii=False)
+        with self._lock, self._db:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO messages (message_id, thread_id, date, classification) VALUES (?, ?, ?, ?)",
+                (key, thread_id, date, payload),
+            ).rowcount
+            if inserted:
+                self._db.execute(_RECORD_THREAD, (thread_id, key, date, payload,
+                                                  datetime.now().isoformat(timespec="seconds")))
+
+    def stats(self) -> dict:
+        with self._lock:
+            messages = self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            threads = self._db.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+        return {"messages": messages, "threads": threads}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()